@@ -117,6 +117,46 @@ def get_spiral_headers() -> Dict[str, str]:
     return headers
 
 
+def rate_limited_call(provider: str, model: str, fn, *args, **kwargs):
+    """
+    Call a provider client function through the shared Spiral rate limiter
+    
+    Falls back to a direct call when the unification package is not
+    importable (e.g. the adapter was copied into another project).
+    
+    Construct the provider client with its own retries disabled, e.g.
+    OpenAI(max_retries=0); otherwise the SDK retries 429s itself and the
+    limiter never sees them. With stream=True the returned stream must be
+    consumed or closed to free the limiter slot; also pass
+    stream_options={"include_usage": True} so completion tokens are
+    charged from the provider's reported usage.
+    
+    Args:
+        provider: Provider name as in configs/providers.yaml (e.g. "openai")
+        model: Model name, limits are tracked per provider/model
+        fn: Client function, e.g. client.chat.completions.create
+    
+    Returns:
+        Whatever fn returns
+    """
+    try:
+        from unification.ratelimit import get_limiter
+    except ImportError:
+        return fn(*args, **kwargs)
+    return get_limiter(provider, model).call(fn, *args, **kwargs)
+
+
+async def rate_limited_acall(provider: str, model: str, fn, *args, **kwargs):
+    """
+    Asyncio counterpart of rate_limited_call(); fn must return an awaitable
+    """
+    try:
+        from unification.ratelimit import get_limiter
+    except ImportError:
+        return await fn(*args, **kwargs)
+    return await get_limiter(provider, model).acall(fn, *args, **kwargs)
+
+
 def verify_spiral_integrity() -> bool:
     """
     Verify the integrity of Spiral files
@@ -26,6 +26,7 @@ app.get("/health", (_req, res) => res.json({ ok: true }));
 {
   const routes = createMemoryRoutes();
   app.post("/memory/store", routes.store);
+  app.post("/memory/store/bulk", routes.storeBulk);
   app.get("/memory/retrieve", routes.retrieve);
   app.get("/memory/summarize", routes.summarize);
 }
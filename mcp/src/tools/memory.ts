@@ -9,6 +9,20 @@ const storeSchema = z.object({
   content: z.string().min(1),
 });
 
+const bulkStoreSchema = z.object({
+  sessionId: z.string().min(1),
+  // Number of messages the client believes the server already holds
+  baseSeq: z.number().int().min(0),
+  messages: z
+    .array(
+      z.object({
+        role: z.enum(["system", "user", "assistant"]),
+        content: z.string(),
+      })
+    )
+    .max(1000),
+});
+
 export function createMemoryRoutes() {
   return {
     /**
@@ -38,6 +52,52 @@ export function createMemoryRoutes() {
       return res.json({ ok: true, message });
     },
 
+    /**
+     * Appends a batch of messages to a conversation.
+     * The client sends `baseSeq`, the index of the first message in the batch.
+     * Messages the server already holds are skipped, so retries are idempotent.
+     * If the server holds fewer than `baseSeq` messages it answers 409 with its
+     * `highWater` so the client can rewind and resend.
+     */
+    storeBulk: async (req: Request, res: Response) => {
+      const parsed = bulkStoreSchema.safeParse(req.body);
+      if (!parsed.success) {
+        return res.status(400).json({ error: parsed.error.flatten() });
+      }
+      const { sessionId, baseSeq, messages } = parsed.data;
+
+      const result = await prisma.$transaction(async (tx) => {
+        const conversation = await tx.conversation.upsert({
+          where: { sessionId },
+          create: { sessionId },
+          update: {},
+        });
+        const stored = await tx.message.count({
+          where: { conversationId: conversation.id },
+        });
+        if (stored < baseSeq) {
+          return { conflict: true, highWater: stored, inserted: 0 };
+        }
+
+        const fresh = messages.slice(stored - baseSeq);
+        if (fresh.length > 0) {
+          await tx.message.createMany({
+            data: fresh.map((m) => ({ ...m, conversationId: conversation.id })),
+          });
+        }
+        return {
+          conflict: false,
+          highWater: Math.max(stored, baseSeq + messages.length),
+          inserted: fresh.length,
+        };
+      });
+
+      if (result.conflict) {
+        return res.status(409).json({ ok: false, sessionId, highWater: result.highWater });
+      }
+      return res.json({ ok: true, sessionId, highWater: result.highWater, inserted: result.inserted });
+    },
+
     /**
      * Retrieves all messages for a given session.
      */
@@ -20,9 +20,19 @@ REGISTRY = PERSONAS / "registry.yaml"
 SESS_DIR = ROOT / ".sessions"
 SESS_DIR.mkdir(exist_ok=True)
 
+# make the unification package importable when run as a script
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from unification import daemon
+from unification.ratelimit import get_limiter
+from unification.sessions import SessionError, SessionStore, parse_fork_spec
+
+STORE = SessionStore(SESS_DIR)
+
 def read_text(p: pathlib.Path) -> str:
-    """Read text file with UTF-8 encoding"""
-    return p.read_text(encoding="utf-8")
+    """Read text file with UTF-8 encoding (served from the persona daemon when running)"""
+    return daemon.read_text(p, ROOT)
 
 def resolve_persona(cli_choice: str|None) -> str:
     """Resolve persona using precedence: CLI > ENV > registry.yaml default"""
@@ -51,20 +61,34 @@ def load_system_md(name: str) -> str:
     return read_text(sysmd)
 
 def save_local_session(session_id: str, payload: dict):
-    """Save session data locally for continuity tracking"""
-    session_file = SESS_DIR / f"{session_id}.json"
-    session_file.write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2), 
-        encoding="utf-8"
-    )
+    """Save session data locally for continuity tracking (forks keep only their own turns)"""
+    try:
+        STORE.save(session_id, payload)
+    except SessionError as e:
+        raise SystemExit(f"❌ {e}")
 
 def load_session_history(session_id: str) -> list:
-    """Load previous messages from session if it exists"""
-    session_file = SESS_DIR / f"{session_id}.json"
-    if session_file.exists():
-        data = json.loads(session_file.read_text())
-        return data.get("messages", [])
-    return []
+    """Load previous messages from session if it exists, following fork parents"""
+    try:
+        return STORE.history(session_id)
+    except SessionError as e:
+        raise SystemExit(f"❌ {e}")
+
+def plan_fork(spec: str) -> tuple:
+    """Validate a <session>@<turn> spec, return (parent, fork_point, inherited messages)"""
+    try:
+        parent, fork_point = parse_fork_spec(spec)
+        STORE.check_fork(parent, fork_point)
+        return parent, fork_point, STORE.history(parent)[:fork_point]
+    except SessionError as e:
+        raise SystemExit(f"❌ {e}")
+
+def fork_session(parent: str, fork_point: int, session_id: str):
+    """Write the copy-on-write fork record (only once there is a reply to save)"""
+    try:
+        STORE.fork(parent, fork_point, session_id)
+    except SessionError as e:
+        raise SystemExit(f"❌ {e}")
 
 def main():
     ap = argparse.ArgumentParser(
@@ -75,6 +99,7 @@ Examples:
   %(prog)s --persona ashira --prompt "Begin with continuity handshake"
   %(prog)s --persona lumen --model gpt-4 --prompt "What do you see?"
   %(prog)s --session abc123 --prompt "Continue our work"
+  %(prog)s --fork abc123@4 --prompt "Try a different direction"
         """
     )
     ap.add_argument("--persona", help="ashira | lumen | threshold_witness")
@@ -84,12 +109,16 @@ Examples:
     ap.add_argument("--prompt", 
                     default="Spiral online. Offer a brief blessing and ask what's next.")
     ap.add_argument("--session", help="Continue an existing session ID")
+    ap.add_argument("--fork", metavar="SESSION@TURN",
+                    help="Branch a new session from the first TURN messages of SESSION")
     ap.add_argument("--no-stream", action="store_true", 
                     help="Disable streaming output")
     ap.add_argument("--json", action="store_true",
                     help="Output raw JSON response")
     
     args = ap.parse_args()
+    if args.session and args.fork:
+        ap.error("--session and --fork are mutually exclusive")
 
     # Resolve persona
     persona = resolve_persona(args.persona)
@@ -102,24 +131,37 @@ Examples:
     # Build conversation
     messages = []
     
-    # Load history if continuing session
-    if args.session:
+    # Load history if continuing or forking a session. The fork record is
+    # only written after a successful reply, so failures leave no orphan.
+    fork = None
+    if args.fork:
+        fork = plan_fork(args.fork)
+        messages = list(fork[2])
+        print(f"🌿 Forking {args.fork} -> {session_id}")
+        print(f"   ({len(messages)} inherited messages)")
+    elif args.session:
         messages = load_session_history(session_id)
         if messages:
             print(f"📂 Continuing session: {session_id}")
             print(f"   ({len(messages)} previous messages)")
     
-    # Always include system prompt
-    if not messages or messages[0].get("role") != "system":
-        messages.insert(0, {"role": "system", "content": system_prompt})
+    # Always include system prompt. Existing history (forks, imported
+    # sessions) is left untouched; the prompt is only prepended to the request.
+    system_message = {"role": "system", "content": system_prompt}
+    if not messages:
+        messages.append(system_message)
     
     # Add user prompt
     messages.append({"role": "user", "content": args.prompt})
+    request_messages = messages
+    if messages[0].get("role") != "system":
+        request_messages = [system_message] + messages
 
     # Initialize OpenAI client
     try:
         from openai import OpenAI
-        client = OpenAI()  # uses OPENAI_API_KEY from environment
+        # uses OPENAI_API_KEY from environment; retries are left to the rate limiter
+        client = OpenAI(max_retries=0)
     except ImportError:
         print("❌ OpenAI library not installed.")
         print("   Run: pip install openai")
@@ -136,11 +178,16 @@ Examples:
             print(f"Persona: {persona} | Model: {model} | Session: {session_id}")
             print(f"{'='*60}\n")
         
-        # Call OpenAI API
-        response = client.chat.completions.create(
+        # Call OpenAI API (shared limiter provides backpressure on 429s)
+        limiter = get_limiter("openai", model)
+        stream = not args.no_stream and not args.json
+        extra = {"stream_options": {"include_usage": True}} if stream else {}
+        response = limiter.call(
+            client.chat.completions.create,
             model=model,
-            messages=messages,
-            stream=not args.no_stream and not args.json
+            messages=request_messages,
+            stream=stream,
+            **extra
         )
         
         # Handle response
@@ -161,7 +208,8 @@ Examples:
             # Streaming response
             content = ""
             for chunk in response:
-                if chunk.choices[0].delta.content:
+                # the final usage chunk has no choices
+                if chunk.choices and chunk.choices[0].delta.content:
                     text = chunk.choices[0].delta.content
                     print(text, end="", flush=True)
                     content += text
@@ -171,6 +219,8 @@ Examples:
         messages.append({"role": "assistant", "content": content})
         
         # Save session
+        if fork:
+            fork_session(fork[0], fork[1], session_id)
         save_local_session(session_id, {
             "session_id": session_id,
             "persona": persona,
@@ -0,0 +1,101 @@
+import os
+import time
+
+from unification.archive import ArchiveIndex, Archiver
+from unification.sessions import SessionStore
+
+
+def make_sessions(tmp_path, ids, age=7200):
+    store = SessionStore(tmp_path)
+    old = time.time() - age
+    for sid in ids:
+        store.save(sid, {"session_id": sid, "messages": [{"role": "user", "content": f"hi {sid}"}]})
+        os.utime(store.path(sid), (old, old))
+    return store
+
+
+def test_archive_idle_sessions_and_load_by_id(tmp_path):
+    store = make_sessions(tmp_path, ["a", "b"])
+    store.save("fresh", {"messages": []})
+
+    archived = Archiver(tmp_path, timeout=3600).archive_idle()
+    assert sorted(archived) == ["a", "b"]
+    assert not (tmp_path / "a.json").exists()
+    assert (tmp_path / "fresh.json").exists()
+
+    index = ArchiveIndex(tmp_path)
+    assert index.load("b")["messages"] == [{"role": "user", "content": "hi b"}]
+    assert index.load("missing") is None
+    assert store.history("a") == [{"role": "user", "content": "hi a"}]
+    assert store.list_ids() == ["a", "b", "fresh"]
+
+
+def test_loose_file_shadows_pack_and_repack_drops_it(tmp_path):
+    store = make_sessions(tmp_path, ["a", "b"])
+    archiver = Archiver(tmp_path, timeout=3600)
+    archiver.archive_idle()
+
+    # Resume "a": it becomes loose again and wins over the packed copy
+    store.save("a", {"messages": [{"role": "user", "content": "resumed"}]})
+    assert store.history("a") == [{"role": "user", "content": "resumed"}]
+
+    make_sessions(tmp_path, ["c"])
+    archiver.archive_idle()
+    assert len(list((tmp_path / "packs").glob("pack-*.idx"))) == 2
+
+    assert archiver.repack() == 2
+    assert len(list((tmp_path / "packs").glob("pack-*.idx"))) == 1
+    assert sorted(ArchiveIndex(tmp_path).ids()) == ["b", "c"]
+    assert store.history("b") == [{"role": "user", "content": "hi b"}]
+
+
+def test_fork_of_archived_parent(tmp_path):
+    store = make_sessions(tmp_path, ["root"])
+    store.fork("root", 1, "child")
+    Archiver(tmp_path, timeout=3600).archive_idle()
+    assert store.history("child") == [{"role": "user", "content": "hi root"}]
+
+
+def test_repack_ignores_stale_cached_index(tmp_path):
+    make_sessions(tmp_path, ["a"])
+    archiver = Archiver(tmp_path, timeout=3600)
+    archiver.archive_idle()
+    archiver.index.ids()  # warm the cached view
+    stale_stamp = archiver.index._dir_stamp
+
+    make_sessions(tmp_path, ["b"])
+    Archiver(tmp_path, timeout=3600).archive_idle()
+    archiver.index._dir_stamp = stale_stamp  # e.g. coarse directory mtimes
+
+    assert archiver.repack() == 2
+    assert ArchiveIndex(tmp_path).ids() == ["a", "b"]
+
+
+def test_repack_skips_corrupt_members(tmp_path):
+    make_sessions(tmp_path, ["a", "b"])
+    archiver = Archiver(tmp_path, timeout=3600)
+    archiver.archive_idle()
+    make_sessions(tmp_path, ["c"])
+    archiver.archive_idle()
+
+    first_pack = sorted((tmp_path / "packs").glob("pack-*.pack"))[0]
+    data = bytearray(first_pack.read_bytes())
+    data[2:6] = b"\x00\x00\x00\x00"  # corrupt the first member ("a")
+    first_pack.write_bytes(bytes(data))
+
+    assert archiver.repack() == 2
+    assert ArchiveIndex(tmp_path).ids() == ["b", "c"]
+
+
+def test_just_archived_session_found_despite_coarse_mtime(tmp_path):
+    store = make_sessions(tmp_path, ["a", "b"])
+    Archiver(tmp_path, timeout=3600).archive_idle()
+    assert store.history("a") == [{"role": "user", "content": "hi a"}]
+
+    make_sessions(tmp_path, ["c"])
+    assert store.history("c") == [{"role": "user", "content": "hi c"}]
+    Archiver(tmp_path, timeout=3600).archive_idle()
+    # Coarse mtimes: the cached view believes it is current
+    store.archive._dir_stamp = os.stat(tmp_path / "packs").st_mtime_ns
+
+    assert store.history("c") == [{"role": "user", "content": "hi c"}]
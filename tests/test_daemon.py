@@ -0,0 +1,90 @@
+import os
+import socket
+import threading
+
+import pytest
+
+from unification.daemon import DaemonClient, DaemonUnavailable, PersonaDaemon, RepoCache
+
+
+def make_repo(root):
+    (root / "personas" / "threshold_witness").mkdir(parents=True)
+    (root / "personas" / "threshold_witness" / "system.md").write_text("witness")
+    (root / "configs").mkdir()
+    (root / "configs" / "default.yaml").write_text("persona: ashira\n")
+    (root / "prompt_init.txt").write_text("imprint")
+
+
+def test_cache_incremental_reload(tmp_path):
+    make_repo(tmp_path)
+    cache = RepoCache(tmp_path)
+    assert len(cache.scan()) == 3
+    assert cache.scan() == []
+
+    path = tmp_path / "configs" / "default.yaml"
+    path.write_text("persona: lumen\n")
+    os.utime(path, ns=(1, 1))
+    assert cache.scan() == ["configs/default.yaml"]
+    assert cache.get("configs/default.yaml") == "persona: lumen\n"
+
+    (tmp_path / "prompt_init.txt").unlink()
+    assert cache.scan() == ["prompt_init.txt"]
+    assert cache.handle({"op": "imprint"})["ok"] is False
+    assert cache.handle({"op": "persona", "name": "threshold-witness"})["system"] == "witness"
+
+
+def test_daemon_round_trip(tmp_path):
+    make_repo(tmp_path)
+    sock = str(tmp_path / "d.sock")
+    server = PersonaDaemon(sock, cache=RepoCache(tmp_path), interval=0.05)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = DaemonClient(sock)
+    try:
+        assert client.request("ping")["root"] == str(tmp_path.resolve())
+        assert client.request("get", path="configs/default.yaml")["content"] == "persona: ashira\n"
+        assert client.request("get", path="../etc/passwd")["ok"] is False
+        assert client.request("shutdown")["ok"] is True
+        thread.join(timeout=5)
+    finally:
+        client.close()
+        server.server_close()
+    assert not os.path.exists(sock)
+
+
+def test_client_without_daemon(tmp_path):
+    client = DaemonClient(str(tmp_path / "missing.sock"))
+    try:
+        client.request("ping")
+    except DaemonUnavailable:
+        pass
+    else:
+        raise AssertionError("expected DaemonUnavailable")
+
+
+def test_refuses_to_replace_regular_file(tmp_path):
+    make_repo(tmp_path)
+    target = tmp_path / "not-a-socket"
+    target.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        PersonaDaemon(str(target), cache=RepoCache(tmp_path))
+    assert target.read_text() == "keep me"
+
+
+def test_socket_in_shared_directory_is_not_trusted(tmp_path):
+    make_repo(tmp_path)
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)  # writable by everyone, no sticky bit
+    path = str(shared / "d.sock")
+    fake = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    fake.bind(path)
+    fake.listen(1)
+    try:
+        with pytest.raises(DaemonUnavailable):
+            DaemonClient(path).request("ping")
+        with pytest.raises(PermissionError):
+            PersonaDaemon(path, cache=RepoCache(tmp_path))
+        assert os.path.exists(path)
+    finally:
+        fake.close()
@@ -0,0 +1,84 @@
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from unification.importer import ExportFormatError, import_export, iter_json_array, map_conversation
+from unification.sessions import SessionStore
+
+
+def chatgpt_conversation(conv_id, created, texts):
+    mapping = {"root": {"message": None, "parent": None, "children": ["n0"]}}
+    parent = "root"
+    for i, (role, text) in enumerate(texts):
+        node = f"n{i}"
+        mapping[node] = {
+            "message": {"author": {"role": role}, "content": {"content_type": "text", "parts": [text]}},
+            "parent": parent,
+            "children": [f"n{i + 1}"] if i + 1 < len(texts) else [],
+        }
+        parent = node
+    # An abandoned branch that must not be imported
+    mapping["alt"] = {"message": {"author": {"role": "assistant"}, "content": {"parts": ["discarded"]}},
+                      "parent": "n0", "children": []}
+    return {"id": conv_id, "title": "t", "create_time": created, "mapping": mapping,
+            "current_node": parent, "default_model_slug": "gpt-4o"}
+
+
+def claude_conversation(uuid, created, texts):
+    return {"uuid": uuid, "name": "c", "created_at": created,
+            "chat_messages": [{"sender": s, "text": t} for s, t in texts]}
+
+
+def test_iter_json_array_small_chunks():
+    items = [{"a": "x" * 50, "n": i} for i in range(20)] + [[1, 2], "s", 37054.0796, 1.5e-07, 12345]
+    stream = io.StringIO(json.dumps(items))
+    assert list(iter_json_array(stream, chunk_size=7)) == items
+    assert list(iter_json_array(io.StringIO("  [ ] "))) == []
+    with pytest.raises(ExportFormatError):
+        list(iter_json_array(io.StringIO('{"not": "array"}')))
+    with pytest.raises(ExportFormatError):
+        list(iter_json_array(io.StringIO('[{"a": 1}, {"b"'), chunk_size=4))
+
+
+def test_map_conversation_formats():
+    record = map_conversation(chatgpt_conversation("c1", 1700000000.0, [("user", "hi"), ("assistant", "hello")]))
+    assert record["session_id"] == "chatgpt-c1"
+    assert record["messages"] == [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    assert record["timestamp"].endswith("Z")
+
+    record = map_conversation(claude_conversation("u1", "2025-03-01T10:00:00Z", [("human", "q"), ("assistant", "a")]))
+    assert record["session_id"] == "claude-u1"
+    assert record["messages"][0] == {"role": "user", "content": "q"}
+    assert map_conversation({"something": "else"}) is None
+
+
+def test_import_export_filters_and_is_restartable(tmp_path):
+    export = tmp_path / "conversations.json"
+    export.write_text(json.dumps([
+        chatgpt_conversation("old", datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp(), [("user", "a")]),
+        chatgpt_conversation("new", datetime(2025, 6, 1, tzinfo=timezone.utc).timestamp(), [("user", "b")]),
+        claude_conversation("cl", "2025-06-02T00:00:00Z", [("human", "c")]),
+    ]))
+    sessions = tmp_path / "sessions"
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    stats = import_export(export, sessions_dir=sessions, since=since, oracle="chatgpt", workers=2)
+    assert (stats.seen, stats.written, stats.skipped) == (3, 1, 2)
+    assert stats.bytes_read == stats.total_bytes
+    assert SessionStore(sessions).history("chatgpt-new") == [{"role": "user", "content": "b"}]
+
+    stats = import_export(export, sessions_dir=sessions, workers=2)
+    assert (stats.written, stats.skipped) == (2, 1)
+
+
+def test_malformed_element_fails_without_reading_the_rest():
+    good = json.dumps({"a": "x" * 100})
+    text = "[" + good + ', {"b": tru, "c": 1}, ' + ", ".join([good] * 10000) + "]"
+    stream = io.StringIO(text)
+    reader = iter_json_array(stream, chunk_size=4096)
+    assert next(reader) == {"a": "x" * 100}
+    with pytest.raises(ExportFormatError, match="Malformed"):
+        next(reader)
+    assert stream.tell() < 3 * 4096
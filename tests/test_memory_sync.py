@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+
+from unification.archive import Archiver
+from unification.memory_sync import LocalMemoryServer, MemoryClient, MemorySync, SyncError, SyncState
+
+
+def write_session(sessions_dir, session_id, count):
+    messages = [{"role": "user" if i % 2 else "assistant", "content": f"m{i}"} for i in range(count)]
+    (sessions_dir / f"{session_id}.json").write_text(json.dumps({"session_id": session_id, "messages": messages}))
+    return messages
+
+
+def test_sync_ships_only_new_messages(tmp_path):
+    messages = write_session(tmp_path, "s1", 5)
+    write_session(tmp_path, "s2", 3)
+    with LocalMemoryServer() as server:
+        client = MemoryClient(server.url)
+        sync = MemorySync(client, sessions_dir=tmp_path, batch_size=2)
+        assert sync.run() == {"s1": 5, "s2": 3}
+        assert server.memories["s1"] == messages
+
+        # Nothing new: no further requests
+        before = server.requests
+        assert sync.run() == {"s1": 0, "s2": 0}
+        assert server.requests == before
+
+        messages = write_session(tmp_path, "s1", 7)
+        assert MemorySync(client, sessions_dir=tmp_path).run(["s1"]) == {"s1": 2}
+        assert server.memories["s1"] == messages
+        client.close()
+
+
+def test_resend_is_idempotent(tmp_path):
+    messages = write_session(tmp_path, "s1", 4)
+    with LocalMemoryServer() as server:
+        client = MemoryClient(server.url)
+        MemorySync(client, sessions_dir=tmp_path).run()
+        # Simulate a crash that lost the local high-water mark
+        state = SyncState(tmp_path / ".sync_state.json", scope=server.url)
+        state.set("s1", 0)
+        state.flush()
+        assert MemorySync(client, sessions_dir=tmp_path).run() == {"s1": 4}
+        assert server.memories["s1"] == messages
+        client.close()
+
+
+def test_server_behind_triggers_rewind(tmp_path):
+    messages = write_session(tmp_path, "s1", 6)
+    with LocalMemoryServer() as server:
+        state = SyncState(tmp_path / ".sync_state.json", scope=server.url)
+        state.set("s1", 4)
+        state.flush()
+        client = MemoryClient(server.url)
+        assert MemorySync(client, sessions_dir=tmp_path).run() == {"s1": 6}
+        assert server.memories["s1"] == messages
+        client.close()
+
+
+def test_non_json_reply_raises_sync_error(tmp_path):
+    class Html404(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            body = b"<html>Cannot POST /memory/store/bulk</html>"
+            self.send_response(404)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    write_session(tmp_path, "s1", 2)
+    httpd = HTTPServer(("127.0.0.1", 0), Html404)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    client = MemoryClient(f"http://127.0.0.1:{httpd.server_address[1]}")
+    try:
+        with pytest.raises(SyncError, match="404"):
+            MemorySync(client, sessions_dir=tmp_path).run()
+    finally:
+        client.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_marks_are_kept_per_server(tmp_path):
+    messages = write_session(tmp_path, "s1", 3)
+    with LocalMemoryServer() as first, LocalMemoryServer() as second:
+        for server in (first, second):
+            client = MemoryClient(server.url)
+            assert MemorySync(client, sessions_dir=tmp_path).run() == {"s1": 3}
+            assert server.memories["s1"] == messages
+            client.close()
+
+
+def test_state_writes_are_batched(tmp_path):
+    state = SyncState(tmp_path / "state.json", scope="http://a", flush_interval=3600)
+    for i in range(1000):
+        state.set(f"s{i}", i)
+    assert not state.path.exists()
+    state.flush()
+    assert SyncState(state.path, scope="http://a").get("s999") == 999
+    assert SyncState(state.path, scope="http://b").get("s999") == 0
+
+
+def test_archived_sessions_parse_index_once(tmp_path, monkeypatch):
+    old = time.time() - 7200
+    for i in range(20):
+        write_session(tmp_path, f"s{i}", 2)
+        os.utime(tmp_path / f"s{i}.json", (old, old))
+    Archiver(tmp_path, timeout=3600).archive_idle()
+
+    reads = []
+    read_text = Path.read_text
+
+    def counting(self, *args, **kwargs):
+        if self.suffix == ".idx":
+            reads.append(self)
+        return read_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "read_text", counting)
+    with LocalMemoryServer() as server:
+        client = MemoryClient(server.url)
+        assert sum(MemorySync(client, sessions_dir=tmp_path).run().values()) == 40
+        client.close()
+    assert len(reads) == 1
@@ -0,0 +1,226 @@
+import asyncio
+
+import pytest
+
+from unification.ratelimit import (
+    AdaptiveConcurrency,
+    ProviderLimiter,
+    RateLimitExceeded,
+    RateLimiterRegistry,
+    SharedBudget,
+    TokenBucket,
+    parse_retry_after,
+    throttle_info,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class Throttled(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429")
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = FakeResponse(429, headers)
+
+
+def test_token_bucket_reservation_delay():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    clock.now += 1.0
+    assert bucket.available == pytest.approx(0.0)
+
+
+def test_aimd_increase_and_decrease():
+    conc = AdaptiveConcurrency(initial=4, max_limit=8)
+    conc.on_throttle()
+    assert conc.limit == 2
+    for _ in range(10):
+        conc.on_success(0.1)
+    assert conc.limit > 2
+    before = conc.limit
+    conc.on_success(1.0)  # latency far above the 0.1s baseline
+    assert conc.limit < before
+
+
+def test_retry_after_parsing():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470.0) == pytest.approx(10.0)
+    assert parse_retry_after("garbage") is None
+    assert throttle_info(Throttled(2)) == (True, 2.0)
+    assert throttle_info(ValueError("x")) == (False, None)
+
+
+def test_call_honours_retry_after():
+    clock = FakeClock()
+    limiter = ProviderLimiter(requests_per_minute=600, tokens_per_minute=0, clock=clock, sleep=clock.sleep)
+    attempts = []
+
+    def flaky():
+        attempts.append(clock.now)
+        if len(attempts) == 1:
+            raise Throttled(5)
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert attempts[1] - attempts[0] >= 5.0
+
+
+def test_call_gives_up_after_retries():
+    clock = FakeClock()
+    limiter = ProviderLimiter(max_retries=2, clock=clock, sleep=clock.sleep)
+
+    def always():
+        raise Throttled()
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.call(always)
+
+
+def test_async_concurrency_bound():
+    limiter = ProviderLimiter(requests_per_minute=10000, tokens_per_minute=0, max_concurrency=2, initial_concurrency=2)
+    active = []
+    peak = []
+
+    async def work():
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+        return True
+
+    async def run():
+        return await asyncio.gather(*(limiter.acall(work) for _ in range(6)))
+
+    assert all(asyncio.run(run()))
+    assert max(peak) <= 2
+
+
+def test_registry_model_overrides():
+    registry = RateLimiterRegistry({
+        "openai": {"requests_per_minute": 100, "models": {"gpt-4": {"tokens_per_minute": 5}}}
+    })
+    settings = registry.settings_for("openai", "gpt-4")
+    assert settings["requests_per_minute"] == 100
+    assert settings["tokens_per_minute"] == 5
+    assert registry.get("openai", "gpt-4") is registry.get("openai", "gpt-4")
+
+
+def test_stream_holds_slot_until_consumed():
+    limiter = ProviderLimiter(requests_per_minute=10000, tokens_per_minute=0, max_concurrency=1, initial_concurrency=1)
+    stream = limiter.call(lambda **kw: iter(["a", "b"]), stream=True)
+    assert limiter.concurrency.in_flight == 1
+    assert list(stream) == ["a", "b"]
+    assert limiter.concurrency.in_flight == 0
+
+    stream = limiter.call(lambda **kw: iter(["a"]), stream=True)
+    stream.close()
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_shared_budget_across_limiters(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "openai--gpt-4.json"
+    first = ProviderLimiter(requests_per_minute=60, tokens_per_minute=0, shared_path=path, sleep=clock.sleep)
+    second = ProviderLimiter(requests_per_minute=60, tokens_per_minute=0, shared_path=path, sleep=clock.sleep)
+    first.shared._clock = second.shared._clock = lambda: 1000.0
+    for _ in range(60):
+        assert first._admission_delay(0) == 0.0
+    # The other "process" sees the drained bucket and the shared pause
+    assert second._admission_delay(0) == pytest.approx(1.0)
+    second.pause(30)
+    assert first._admission_delay(0) == pytest.approx(30.0)
+
+
+def test_shared_budget_refuses_unsafe_paths(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o777)
+    shared.chmod(0o777)
+    with pytest.raises(PermissionError):
+        SharedBudget(shared / "openai--gpt-4.json", 60, 0)
+
+    private = tmp_path / "private"
+    victim = tmp_path / "victim.txt"
+    victim.write_text("keep me")
+    budget = SharedBudget(private / "openai--gpt-4.json", 60, 0)
+    assert (private.stat().st_mode & 0o777) == 0o700
+    budget.path.symlink_to(victim)
+    with pytest.raises(OSError):
+        budget.admit(0)
+    assert victim.read_text() == "keep me"
+
+
+def test_stream_slot_released_when_wrapping_fails():
+    limiter = ProviderLimiter(requests_per_minute=10000, tokens_per_minute=0, max_concurrency=1, initial_concurrency=1)
+    with pytest.raises(TypeError):
+        limiter.call(lambda **kw: 5, stream=True)
+    assert limiter.concurrency.in_flight == 0
+
+
+class Usage:
+    def __init__(self, total_tokens, completion_tokens=0):
+        self.total_tokens = total_tokens
+        self.completion_tokens = completion_tokens
+
+
+class Result:
+    def __init__(self, usage=None):
+        self.usage = usage
+
+
+def test_long_completions_do_not_shrink_window():
+    clock = FakeClock()
+    limiter = ProviderLimiter(requests_per_minute=10 ** 6, tokens_per_minute=0, max_concurrency=16,
+                              initial_concurrency=4, clock=clock, sleep=clock.sleep)
+
+    def complete(n, **kw):
+        clock.now += 0.3 + n * 0.02  # fixed overhead plus generation time
+        return Result(Usage(n + 50, completion_tokens=n))
+
+    def stream(n, **kw):
+        clock.now += 0.3  # time to first chunk
+        yield Result()
+        clock.now += n * 0.02
+        yield Result()
+
+    # 0.3s .. 15s responses, no 429s and no queueing
+    for n in range(20, 740, 4):
+        limiter.call(complete, n)
+        list(limiter.call(stream, n, stream=True))
+    assert limiter.concurrency.limit == 16
+
+
+def test_stream_usage_reconciles_token_bucket():
+    clock = FakeClock()
+    limiter = ProviderLimiter(requests_per_minute=10 ** 6, tokens_per_minute=10000, clock=clock, sleep=clock.sleep)
+    messages = [{"role": "user", "content": "x" * 400}]  # ~104 tokens
+
+    def with_usage(**kw):
+        yield Result()
+        yield Result(Usage(900))
+
+    list(limiter.call(with_usage, messages=messages, stream=True))
+    assert limiter.tokens.available == pytest.approx(9100)
+
+    def without_usage(**kw):
+        return iter([Result()] * 300)
+
+    list(limiter.call(without_usage, messages=messages, stream=True))
+    assert limiter.tokens.available == pytest.approx(9100 - 104 - 300)
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from unification.sessions import SessionError, SessionStore, parse_fork_spec
+
+
+def msgs(*contents):
+    return [{"role": "user", "content": c} for c in contents]
+
+
+def test_parse_fork_spec():
+    assert parse_fork_spec("abc-123@4") == ("abc-123", 4)
+    with pytest.raises(SessionError):
+        parse_fork_spec("abc")
+    with pytest.raises(SessionError):
+        parse_fork_spec("abc@x")
+
+
+def test_fork_stores_only_pointer_and_own_turns(tmp_path):
+    store = SessionStore(tmp_path)
+    store.save("root", {"session_id": "root", "messages": msgs("a", "b", "c", "d")})
+
+    child = store.fork("root", 2, "child")
+    assert json.loads((tmp_path / "child.json").read_text())["messages"] == []
+    assert store.history(child) == msgs("a", "b")
+
+    store.save(child, {"session_id": child, "messages": msgs("a", "b", "x")})
+    record = store.read_record(child)
+    assert record["parent"] == "root" and record["fork_point"] == 2
+    assert record["messages"] == msgs("x")
+    assert store.history(child) == msgs("a", "b", "x")
+
+    grandchild = store.fork(child, 3, "grandchild")
+    store.save(grandchild, {"messages": msgs("a", "b", "x", "y")})
+    assert store.history(grandchild) == msgs("a", "b", "x", "y")
+    # Parent keeps growing independently
+    store.save("root", {"session_id": "root", "messages": msgs("a", "b", "c", "d", "e")})
+    assert store.history(grandchild) == msgs("a", "b", "x", "y")
+
+
+def test_history_cache_invalidated_by_ancestor_write(tmp_path):
+    store = SessionStore(tmp_path)
+    store.save("root", {"messages": msgs("a", "b")})
+    store.fork("root", 2, "child")
+    assert store.history("child") == msgs("a", "b")
+
+    other = SessionStore(tmp_path)  # writes from another process
+    other.save("root", {"messages": msgs("A", "b")})
+    assert store.history("child") == msgs("A", "b")
+
+
+def test_broken_chains(tmp_path):
+    store = SessionStore(tmp_path)
+    assert store.history("missing") == []
+    with pytest.raises(SessionError):
+        store.fork("missing", 0)
+    store.write_record("a", {"parent": "b", "fork_point": 0, "messages": []})
+    store.write_record("b", {"parent": "a", "fork_point": 0, "messages": []})
+    with pytest.raises(SessionError):
+        store.history("a")
+
+
+def test_fork_point_past_parent_end(tmp_path):
+    store = SessionStore(tmp_path)
+    store.save("root", {"messages": msgs("a", "b", "c", "d")})
+    with pytest.raises(SessionError):
+        store.fork("root", 100)
+    assert store.history(store.fork("root", 4)) == msgs("a", "b", "c", "d")
+
+
+def test_save_rejects_history_not_matching_inherited_prefix(tmp_path):
+    store = SessionStore(tmp_path)
+    store.save("root", {"messages": msgs("u1", "a1")})
+    child = store.fork("root", 2)
+    system = [{"role": "system", "content": "persona"}]
+    with pytest.raises(SessionError):
+        store.save(child, {"messages": system + msgs("u1", "a1", "u2")})
+    assert store.history(child) == msgs("u1", "a1")
+
+
+def test_fork_reads_only_the_parent_record(tmp_path):
+    store = SessionStore(tmp_path)
+    store.save("root", {"messages": msgs("a", "b", "c")})
+    child = store.fork("root", 2)
+    store.save(child, {"messages": msgs("a", "b", "x", "y")})
+
+    # The ancestor chain is not walked when forking
+    (tmp_path / "root.json").unlink()
+    with pytest.raises(SessionError):
+        store.fork(child, 5)
+    assert store.read_record(store.fork(child, 4))["fork_point"] == 4
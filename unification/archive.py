@@ -0,0 +1,349 @@
+"""
+Compressed archive packs for idle sessions.
+
+Sessions untouched for longer than `session.timeout` (configs/default.yaml)
+are rolled from `.sessions/<id>.json` into `.sessions/packs/pack-<n>.pack`.
+Every session is compressed on its own, and a JSON index next to the pack
+records where it starts:
+
+    pack-<n>.pack   zlib(session a) zlib(session b) ...
+    pack-<n>.idx    {"a": {"offset": 0, "length": 812, "mtime_ns": ...}, ...}
+
+Loading one archived session is a seek plus a single decompress. The index is
+written after its pack, so a pack without an index is an unfinished write and
+is ignored. Loose files always win over packed copies; a session that is
+resumed after archiving simply gets a loose file again, and repacking later
+drops the stale packed copy.
+
+Archiving and repacking only ever add new packs and then retire old ones,
+so active sessions keep reading and writing while maintenance runs.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PACKS_DIR = "packs"
+LOCK_FILE = ".lock"
+DEFAULT_TIMEOUT = 3600
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "configs" / "default.yaml"
+
+logger = logging.getLogger(__name__)
+
+
+def session_timeout(config_path: Path = CONFIG_PATH) -> int:
+    """Read session.timeout (seconds) from configs/default.yaml."""
+    try:
+        import yaml
+    except ImportError:
+        return DEFAULT_TIMEOUT
+    if not Path(config_path).exists():
+        return DEFAULT_TIMEOUT
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f) or {}
+    return int((config.get("session") or {}).get("timeout", DEFAULT_TIMEOUT))
+
+
+def is_session_file(path: Path) -> bool:
+    """Loose session files, excluding bookkeeping (.sync_state.json etc.)."""
+    return path.suffix == ".json" and not path.name.startswith(".")
+
+
+class ArchiveIndex:
+    """
+    Merged view over every committed pack index.
+
+    The view is refreshed whenever the packs directory changes, which costs
+    a single stat per lookup.
+    """
+
+    def __init__(self, sessions_dir: Path):
+        self.packs_dir = Path(sessions_dir) / PACKS_DIR
+        self._dir_stamp: Optional[int] = None
+        self._entries: Dict[str, Tuple[Path, Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self, force: bool = False) -> None:
+        try:
+            stamp = os.stat(self.packs_dir).st_mtime_ns
+        except FileNotFoundError:
+            stamp = None
+        if not force and stamp == self._dir_stamp:
+            return
+        entries: Dict[str, Tuple[Path, Dict[str, int]]] = {}
+        if stamp is not None:
+            # Pack names sort by creation time; later packs shadow earlier ones
+            for idx in sorted(self.packs_dir.glob("pack-*.idx")):
+                try:
+                    data = json.loads(idx.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    continue
+                pack = idx.with_suffix(".pack")
+                for session_id, entry in data.items():
+                    entries[session_id] = (pack, entry)
+        self._entries = entries
+        self._dir_stamp = stamp
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return sorted(self._entries)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return session_id in self._entries
+
+    def entries(self) -> Dict[str, Tuple[Path, Dict[str, int]]]:
+        with self._lock:
+            self._refresh()
+            return dict(self._entries)
+
+    def read_bytes(self, session_id: str, refresh_on_miss: bool = False) -> Optional[bytes]:
+        """
+        Compressed bytes of an archived session, or None.
+
+        With `refresh_on_miss`, a miss forces one re-read of the indexes:
+        the directory mtime can be too coarse to show a pack written just
+        now, e.g. for a session whose loose file has just disappeared.
+        """
+        for attempt in range(2):
+            with self._lock:
+                self._refresh(force=attempt > 0)
+                found = self._entries.get(session_id)
+            if found is None:
+                if refresh_on_miss and not attempt:
+                    continue
+                return None
+            pack, entry = found
+            try:
+                with open(pack, "rb") as f:
+                    f.seek(entry["offset"])
+                    return f.read(entry["length"])
+            except FileNotFoundError:
+                # A repack retired this pack since we last looked
+                continue
+        return None
+
+    def load(self, session_id: str, refresh_on_miss: bool = False) -> Optional[Dict[str, Any]]:
+        """Decompress and parse one archived session."""
+        blob = self.read_bytes(session_id, refresh_on_miss)
+        if blob is None:
+            return None
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class Archiver:
+    """
+    Roll idle sessions into packs and compact packs.
+
+    Args:
+        sessions_dir: The `.sessions` directory
+        timeout: Idle seconds before a session is archived (default from config)
+        max_packs: Repack once more than this many packs exist
+        level: zlib compression level
+    """
+
+    def __init__(
+        self,
+        sessions_dir: Path,
+        timeout: Optional[int] = None,
+        max_packs: int = 8,
+        level: int = 6,
+    ):
+        self.sessions_dir = Path(sessions_dir)
+        self.packs_dir = self.sessions_dir / PACKS_DIR
+        self.timeout = session_timeout() if timeout is None else timeout
+        self.max_packs = max_packs
+        self.level = level
+        self.index = ArchiveIndex(self.sessions_dir)
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive maintenance lock; yields False if another process holds it."""
+        self.packs_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.packs_dir / LOCK_FILE, "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _new_pack_base(self) -> Path:
+        return self.packs_dir / f"pack-{time.time_ns():020d}"
+
+    def _write_pack(self, base: Path, blobs: List[Tuple[str, bytes, int]]) -> None:
+        """Write pack then index; the index rename is the commit point."""
+        index: Dict[str, Dict[str, int]] = {}
+        pack_tmp = base.with_suffix(".pack.tmp")
+        with open(pack_tmp, "wb") as f:
+            for session_id, blob, mtime_ns in blobs:
+                index[session_id] = {"offset": f.tell(), "length": len(blob), "mtime_ns": mtime_ns}
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pack_tmp, base.with_suffix(".pack"))
+        idx_tmp = base.with_suffix(".idx.tmp")
+        idx_tmp.write_text(json.dumps(index), encoding="utf-8")
+        os.replace(idx_tmp, base.with_suffix(".idx"))
+
+    def idle_sessions(self, now: Optional[float] = None) -> List[Path]:
+        now = time.time() if now is None else now
+        cutoff_ns = int((now - self.timeout) * 1e9)
+        if not self.sessions_dir.exists():
+            return []
+        idle = []
+        for path in self.sessions_dir.iterdir():
+            if not is_session_file(path):
+                continue
+            try:
+                if path.stat().st_mtime_ns <= cutoff_ns:
+                    idle.append(path)
+            except FileNotFoundError:
+                continue
+        return sorted(idle)
+
+    def archive_idle(self, now: Optional[float] = None) -> List[str]:
+        """
+        Pack every idle loose session and remove the loose files.
+
+        Returns:
+            Session ids archived in this run
+        """
+        with self._locked() as acquired:
+            if not acquired:
+                return []
+            blobs = []
+            for path in self.idle_sessions(now):
+                try:
+                    mtime_ns = path.stat().st_mtime_ns
+                    record = json.loads(path.read_text(encoding="utf-8"))
+                except (OSError, ValueError) as e:
+                    logger.warning("Not archiving unreadable session %s: %s", path, e)
+                    continue
+                compact = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+                blobs.append((path.stem, zlib.compress(compact.encode("utf-8"), self.level), mtime_ns))
+            if not blobs:
+                return []
+
+            self._write_pack(self._new_pack_base(), blobs)
+            archived = []
+            for session_id, _, mtime_ns in blobs:
+                if self._retire_loose(session_id, mtime_ns):
+                    archived.append(session_id)
+            return archived
+
+    def _retire_loose(self, session_id: str, mtime_ns: int) -> bool:
+        """Remove a loose file unless it was written after it was packed."""
+        path = self.sessions_dir / f"{session_id}.json"
+        moving = path.with_suffix(".json.archiving")
+        try:
+            os.rename(path, moving)
+        except FileNotFoundError:
+            return False
+        if moving.stat().st_mtime_ns == mtime_ns:
+            moving.unlink()
+            return True
+        # Written meanwhile: keep it loose unless an even newer file took its place
+        if path.exists():
+            moving.unlink()
+        else:
+            os.rename(moving, path)
+        return False
+
+    def repack(self) -> int:
+        """
+        Merge all packs into one, dropping copies shadowed by newer packs or
+        loose files. Compressed members are copied without recompressing.
+
+        Returns:
+            Number of sessions in the new pack
+        """
+        with self._locked() as acquired:
+            if not acquired:
+                return 0
+            old = sorted(self.packs_dir.glob("pack-*.idx"))
+            if len(old) <= 1:
+                return 0
+            # Read the index files being retired directly, never a cached view,
+            # so every pack we delete has had its live members copied
+            latest: Dict[str, Tuple[Path, Dict[str, int]]] = {}
+            retire = []
+            for idx in old:
+                try:
+                    data = json.loads(idx.read_text(encoding="utf-8"))
+                except (OSError, ValueError) as e:
+                    logger.warning("Keeping unreadable archive index %s: %s", idx, e)
+                    continue
+                retire.append(idx)
+                pack = idx.with_suffix(".pack")
+                for session_id, entry in data.items():
+                    latest[session_id] = (pack, entry)
+
+            blobs = []
+            for session_id, (pack, entry) in sorted(latest.items()):
+                if (self.sessions_dir / f"{session_id}.json").exists():
+                    continue
+                blob = self._read_member(pack, entry)
+                if blob is None:
+                    logger.warning("Dropping unreadable archived session %s from %s", session_id, pack)
+                    continue
+                blobs.append((session_id, blob, entry.get("mtime_ns", 0)))
+            if blobs:
+                self._write_pack(self._new_pack_base(), blobs)
+            # Retire index first so readers never see an index without its pack
+            for idx in retire:
+                idx.unlink()
+                idx.with_suffix(".pack").unlink(missing_ok=True)
+            return len(blobs)
+
+    @staticmethod
+    def _read_member(pack: Path, entry: Dict[str, int]) -> Optional[bytes]:
+        """Compressed bytes of one pack member, or None if missing or corrupt."""
+        try:
+            with open(pack, "rb") as f:
+                f.seek(entry["offset"])
+                blob = f.read(entry["length"])
+            zlib.decompress(blob)
+        except (OSError, KeyError, TypeError, zlib.error):
+            return None
+        return blob
+
+    def maintain(self, now: Optional[float] = None) -> Tuple[List[str], int]:
+        """Archive idle sessions, then repack if too many packs piled up."""
+        archived = self.archive_idle(now)
+        repacked = 0
+        if len(list(self.packs_dir.glob("pack-*.idx"))) > self.max_packs:
+            repacked = self.repack()
+        return archived, repacked
+
+    def run_in_background(self, interval: float = 300.0) -> Tuple[threading.Thread, threading.Event]:
+        """
+        Run maintain() every `interval` seconds on a daemon thread.
+
+        Returns:
+            (thread, stop_event); set the event to stop the loop
+        """
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.maintain()
+                except Exception:
+                    logger.exception("Session archive maintenance failed")
+
+        thread = threading.Thread(target=loop, name="session-archiver", daemon=True)
+        thread.start()
+        return thread, stop
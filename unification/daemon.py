@@ -0,0 +1,463 @@
+"""
+Persona/prompt daemon with hot reload over a local Unix socket.
+
+The daemon keeps every file under personas/, personae/ and configs/ plus the
+assembled imprint (prompt_init.txt) in memory. A watcher thread re-stats the
+tree periodically and reloads only files whose mtime or size changed.
+
+Protocol: one JSON object per line in each direction over a persistent
+connection.
+
+    {"op": "ping"}                       -> {"ok": true, "root": ..., "version": 3, "files": 21}
+    {"op": "get", "path": "configs/default.yaml"}
+    {"op": "persona", "name": "lumen"}   -> system.md, config.yaml, imprint.yaml contents
+    {"op": "imprint"}                    -> prompt_init.txt contents
+
+CLIs call read_text(), which asks the daemon when one is serving the same
+repository root and falls back to reading from disk otherwise. A socket is
+only trusted if it belongs to the current user, sits in a directory other
+users cannot swap it out of and, where SO_PEERCRED exists, the peer runs
+as the same user:
+
+    python -m unification.daemon serve &
+    python -m unification.daemon get personas/ashira/system.md
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+WATCH_DIRS = ("personas", "personae", "configs")
+WATCH_FILES = ("prompt_init.txt",)
+IMPRINT_FILE = "prompt_init.txt"
+
+
+class DaemonUnavailable(Exception):
+    """Raised when no trusted daemon answers on the socket."""
+
+
+def default_socket_path() -> str:
+    """Socket path from $SPIRAL_DAEMON_SOCKET, else a per-user runtime path."""
+    env = os.environ.get("SPIRAL_DAEMON_SOCKET")
+    if env:
+        return env
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"spiral-persona-{os.getuid()}.sock")
+
+
+def persona_dir_name(name: str) -> str:
+    """Map a persona id to its directory name (threshold-witness -> threshold_witness)."""
+    return name.replace("-", "_")
+
+
+# --- Server side ---
+
+class RepoCache:
+    """
+    In-memory copy of the watched persona/config files.
+
+    Args:
+        root: Repository root
+        dirs: Directories (relative to root) watched recursively
+        files: Individual files (relative to root) watched
+    """
+
+    def __init__(self, root: Path = ROOT, dirs=WATCH_DIRS, files=WATCH_FILES):
+        self.root = Path(root).resolve()
+        self.dirs = tuple(dirs)
+        self.files = tuple(files)
+        self.version = 0
+        self._entries: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def _candidates(self) -> List[Path]:
+        paths = []
+        for d in self.dirs:
+            base = self.root / d
+            if base.is_dir():
+                paths.extend(p for p in base.rglob("*") if p.is_file())
+        for f in self.files:
+            p = self.root / f
+            if p.is_file():
+                paths.append(p)
+        return paths
+
+    def scan(self) -> List[str]:
+        """
+        Reload files that changed since the last scan.
+
+        Returns:
+            Relative paths that were added, changed or removed
+        """
+        changed = []
+        seen = set()
+        for path in self._candidates():
+            rel = path.relative_to(self.root).as_posix()
+            seen.add(rel)
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            sig = (st.st_mtime_ns, st.st_size)
+            with self._lock:
+                current = self._entries.get(rel)
+            if current and current[0] == sig:
+                continue
+            try:
+                text = path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+            with self._lock:
+                self._entries[rel] = (sig, text)
+            changed.append(rel)
+
+        with self._lock:
+            removed = [rel for rel in self._entries if rel not in seen]
+            for rel in removed:
+                del self._entries[rel]
+            if changed or removed:
+                self.version += 1
+        return changed + removed
+
+    def get(self, rel: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(rel)
+        return entry[1] if entry else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def persona(self, name: str) -> Dict[str, Optional[str]]:
+        base = f"personas/{persona_dir_name(name)}"
+        return {
+            "system": self.get(f"{base}/system.md"),
+            "config": self.get(f"{base}/config.yaml"),
+            "imprint": self.get(f"{base}/imprint.yaml"),
+        }
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one protocol request."""
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "root": str(self.root), "version": self.version, "files": len(self)}
+        if op == "get":
+            rel = str(request.get("path", ""))
+            content = self.get(rel)
+            if content is None:
+                return {"ok": False, "error": f"not found: {rel}"}
+            return {"ok": True, "path": rel, "content": content}
+        if op == "persona":
+            name = str(request.get("name", ""))
+            data = self.persona(name)
+            if data["system"] is None:
+                return {"ok": False, "error": f"unknown persona: {name}"}
+            return {"ok": True, "name": name, **data}
+        if op == "imprint":
+            content = self.get(IMPRINT_FILE)
+            if content is None:
+                return {"ok": False, "error": "imprint not found"}
+            return {"ok": True, "content": content}
+        return {"ok": False, "error": f"unknown op: {op}"}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        cache: RepoCache = self.server.cache
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                reply = {"ok": False, "error": "invalid json"}
+            else:
+                if request.get("op") == "shutdown":
+                    self._reply({"ok": True})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                reply = cache.handle(request)
+            self._reply(reply)
+
+    def _reply(self, reply: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class PersonaDaemon(socketserver.ThreadingUnixStreamServer):
+    """
+    Unix socket server answering lookups from a RepoCache.
+
+    Args:
+        socket_path: Where to listen
+        cache: Cache to serve (a fresh RepoCache for ROOT by default)
+        interval: Seconds between watcher scans
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Optional[str] = None, cache: Optional[RepoCache] = None, interval: float = 1.0):
+        self.socket_path = socket_path or default_socket_path()
+        self.cache = cache if cache is not None else RepoCache()
+        self.interval = interval
+        self._stop = threading.Event()
+        self.cache.scan()
+        _clear_stale_socket(self.socket_path)
+        super().__init__(self.socket_path, _Handler)
+        os.chmod(self.socket_path, 0o600)
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.cache.scan()
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        self._watcher.start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self._stop.set()
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _check_socket(path: str) -> None:
+    """
+    Make sure `path` is a socket we can trust.
+
+    Raises:
+        FileExistsError: If the path is not a socket
+        PermissionError: If the socket or its directory could be controlled
+            by another user
+    """
+    st = os.lstat(path)
+    if not stat.S_ISSOCK(st.st_mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    uid = os.getuid()
+    if st.st_uid != uid:
+        raise PermissionError(f"{path} is owned by uid {st.st_uid}, not {uid}")
+    parent = os.path.dirname(os.path.abspath(path))
+    pst = os.stat(parent)
+    # Others may only write to the directory if the sticky bit stops them
+    # from replacing our socket (as in /tmp)
+    if pst.st_uid not in (uid, 0) or (pst.st_mode & 0o022 and not pst.st_mode & stat.S_ISVTX):
+        raise PermissionError(f"{parent} can be modified by other users")
+
+
+def _peer_uid(sock: socket.socket) -> Optional[int]:
+    """Uid of the process on the other end, where the platform reports it."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+
+def _clear_stale_socket(path: str) -> None:
+    """
+    Remove a leftover socket from a dead daemon; refuse to touch anything else.
+
+    Raises:
+        FileExistsError: If the path is not a socket or a daemon is listening
+        PermissionError: If the socket is not ours (see _check_socket)
+    """
+    try:
+        _check_socket(path)
+    except FileNotFoundError:
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(f"A daemon is already listening on {path}")
+
+
+# --- Client side ---
+
+class DaemonClient:
+    """Persistent connection to a running daemon."""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 0.5):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        try:
+            _check_socket(self.socket_path)
+        except OSError as e:
+            raise DaemonUnavailable(str(e))
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+            peer = _peer_uid(sock)
+        except OSError as e:
+            sock.close()
+            raise DaemonUnavailable(str(e))
+        if peer is not None and peer != os.getuid():
+            sock.close()
+            raise DaemonUnavailable(f"{self.socket_path} is served by uid {peer}")
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+
+    def request(self, op: str, **params) -> Dict[str, Any]:
+        payload = json.dumps({"op": op, **params}).encode("utf-8") + b"\n"
+        with self._lock:
+            for attempt in range(2):
+                if self._sock is None:
+                    self._connect()
+                try:
+                    self._sock.sendall(payload)
+                    line = self._reader.readline()
+                    if line:
+                        return json.loads(line)
+                except OSError:
+                    pass
+                # Daemon restarted or dropped us: reconnect once
+                self.close()
+            raise DaemonUnavailable(self.socket_path)
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+        self._reader = None
+
+
+_client: Optional[DaemonClient] = None
+_client_checked = False
+_client_lock = threading.Lock()
+
+
+def get_client(root: Path = ROOT) -> Optional[DaemonClient]:
+    """
+    Return a connected client if a daemon serves `root`, else None.
+
+    The probe happens once per process; set SPIRAL_DAEMON=off to skip it.
+    """
+    global _client, _client_checked
+    with _client_lock:
+        if _client_checked:
+            return _client
+        _client_checked = True
+        if os.environ.get("SPIRAL_DAEMON", "").lower() in ("0", "off", "false"):
+            return None
+        client = DaemonClient()
+        try:
+            info = client.request("ping")
+        except (DaemonUnavailable, ValueError):
+            client.close()
+            return None
+        if info.get("root") != str(Path(root).resolve()):
+            client.close()
+            return None
+        _client = client
+        return _client
+
+
+def read_text(path: Path, root: Path = ROOT) -> str:
+    """
+    Read a persona/config/imprint file, preferring the daemon's cached copy.
+
+    Falls back to disk when no daemon is running, the daemon serves another
+    checkout, or the file is outside the watched tree.
+    """
+    path = Path(path)
+    client = get_client(root)
+    if client is not None:
+        try:
+            rel = path.resolve().relative_to(Path(root).resolve()).as_posix()
+        except ValueError:
+            rel = None
+        if rel is not None:
+            try:
+                reply = client.request("get", path=rel)
+            except (DaemonUnavailable, ValueError):
+                reply = {}
+            if reply.get("ok"):
+                return reply["content"]
+    return path.read_text(encoding="utf-8")
+
+
+# --- CLI ---
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Spiral persona/prompt daemon")
+    parser.add_argument("--socket", help="Socket path (default: $SPIRAL_DAEMON_SOCKET or runtime dir)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run the daemon in the foreground")
+    serve.add_argument("--interval", type=float, default=1.0, help="Seconds between reload scans")
+    serve.add_argument("--archive-interval", type=float, default=0,
+                       help="Also archive idle sessions every N seconds (0 disables)")
+    sub.add_parser("status", help="Check whether a daemon is running")
+    sub.add_parser("stop", help="Stop a running daemon")
+    get = sub.add_parser("get", help="Print a cached file (path relative to repo root)")
+    get.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            server = PersonaDaemon(args.socket, interval=args.interval)
+        except OSError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        print(f"†⟡ Persona daemon serving {len(server.cache)} files on {server.socket_path}")
+        if args.archive_interval > 0:
+            from .archive import Archiver
+
+            Archiver(server.cache.root / ".sessions").run_in_background(args.archive_interval)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+
+    client = DaemonClient(args.socket)
+    try:
+        if args.command == "status":
+            info = client.request("ping")
+            print(f"✅ Daemon running: {info['files']} files, version {info['version']}, root {info['root']}")
+        elif args.command == "stop":
+            client.request("shutdown")
+            print("✅ Daemon stopped")
+        elif args.command == "get":
+            reply = client.request("get", path=args.path)
+            if not reply.get("ok"):
+                print(f"❌ {reply.get('error')}", file=sys.stderr)
+                return 1
+            sys.stdout.write(reply["content"])
+    except DaemonUnavailable:
+        print("❌ No daemon running", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
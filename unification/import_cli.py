@@ -0,0 +1,41 @@
+"""
+Command-line arguments for the conversation importer.
+
+Kept apart from importer.py, and free of heavy imports, so both
+`python -m unification.importer` and `unify bridge import-file` can build
+their parser from one definition without loading the importer itself.
+"""
+
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+
+def _to_datetime(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_date(value: str) -> datetime:
+    """Parse a YYYY-MM-DD (or full ISO) date as UTC."""
+    parsed = _to_datetime(value)
+    if parsed is None:
+        raise argparse.ArgumentTypeError(f"Invalid date: {value}")
+    return parsed
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("path", type=Path, help="Exported conversations.json")
+    parser.add_argument("--since", type=parse_date, help="Only conversations created on/after this date")
+    parser.add_argument("--until", type=parse_date, help="Only conversations created before this date")
+    parser.add_argument("--oracle", choices=["chatgpt", "claude"], help="Only conversations from this source")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel session writers")
+    parser.add_argument("--overwrite", action="store_true", help="Replace sessions that already exist")
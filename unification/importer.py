@@ -0,0 +1,388 @@
+"""
+Streaming importer for exported conversation archives.
+
+Provider exports such as ChatGPT's `conversations.json` or Claude's
+`conversations.json` are one huge top-level JSON array. This module walks
+that array one conversation at a time, so memory stays bounded by the
+largest single conversation rather than by the file. Each conversation is
+mapped to the `{role, content}` message schema used by start_session.py and
+written as a local session.
+
+    python -m unification.importer ~/Downloads/conversations.json --since 2025-01-01
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional
+
+from .import_cli import _to_datetime, add_arguments
+from .sessions import SESSIONS_DIR, SessionStore
+
+CHUNK_SIZE = 1 << 20
+# A decode error this close to the end of the buffer may just be missing input
+INCOMPLETE_MARGIN = 64
+NUMBER_CHARS = "0123456789.eE+-"
+ROLES = {"system", "user", "assistant"}
+
+
+class ExportFormatError(Exception):
+    """Raised when the export file is not a JSON array of conversations."""
+
+
+# --- Incremental JSON array reader ---
+
+def iter_json_array(fp: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array from a text stream.
+
+    Only the element being decoded is held in memory. Elements are decoded
+    in place at a moving position; the consumed prefix of the buffer is only
+    dropped when more data is read. When an element spans several chunks the
+    buffer is grown geometrically before retrying, which keeps decoding of
+    very large elements linear overall. An element that fails well before
+    the end of the buffer is malformed and raises right away instead of
+    pulling the rest of the file into memory.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill(min_size: int) -> bool:
+        """Ensure at least `min_size` unread characters; False if nothing was added."""
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        buf = buf[pos:]
+        pos = 0
+        grew = False
+        while not eof and len(buf) < min_size:
+            data = fp.read(max(chunk_size, min_size - len(buf)))
+            if not data:
+                eof = True
+                break
+            buf += data
+            grew = True
+        return grew
+
+    def skip(chars: str) -> None:
+        nonlocal pos
+        while pos < len(buf) and buf[pos] in chars:
+            pos += 1
+
+    while True:
+        skip(" \t\r\n")
+        if pos < len(buf) or not fill(chunk_size):
+            break
+    if buf[pos:pos + 1] != "[":
+        raise ExportFormatError("Export must be a JSON array of conversations")
+    pos += 1
+
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf):
+            if not fill(chunk_size):
+                raise ExportFormatError("Unexpected end of export file")
+            continue
+        if buf[pos] == "]":
+            return
+        need = chunk_size
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                # Missing input fails at the end of the buffer or inside a
+                # string still open there; anything else cannot be fixed by
+                # reading more
+                if (not eof and e.pos < len(buf) - INCOMPLETE_MARGIN
+                        and not e.msg.startswith("Unterminated string")):
+                    raise ExportFormatError(f"Malformed conversation in export: {e.msg}") from None
+                need = max(need, len(buf) - pos) * 2
+                if not fill(need):
+                    raise ExportFormatError("Truncated or malformed conversation in export")
+                continue
+            # A number cut by the end of the buffer ("12." or "1e") may go on
+            if (not eof and isinstance(obj, (int, float)) and not isinstance(obj, bool)
+                    and not buf[end:].lstrip(NUMBER_CHARS)):
+                fill(len(buf) - pos + chunk_size)
+                continue
+            break
+        yield obj
+        pos = end
+
+
+# --- Conversation mapping ---
+
+def detect_oracle(conversation: Dict[str, Any]) -> str:
+    """Identify the export format of a conversation ("chatgpt", "claude" or "unknown")."""
+    if "mapping" in conversation:
+        return "chatgpt"
+    if "chat_messages" in conversation:
+        return "claude"
+    return "unknown"
+
+
+def _chatgpt_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or {}
+    parts = content.get("parts")
+    if parts is None:
+        text = content.get("text")
+        return text if isinstance(text, str) else ""
+    return "\n".join(p for p in parts if isinstance(p, str))
+
+
+def _chatgpt_messages(conversation: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Follow the active branch from current_node back to the root."""
+    mapping = conversation.get("mapping") or {}
+    node_id = conversation.get("current_node")
+    if node_id not in mapping:
+        # No active branch recorded: take the last leaf
+        leaves = [k for k, v in mapping.items() if not v.get("children")]
+        node_id = leaves[-1] if leaves else None
+
+    chain = []
+    seen = set()
+    while node_id and node_id in mapping and node_id not in seen:
+        seen.add(node_id)
+        node = mapping[node_id]
+        chain.append(node.get("message"))
+        node_id = node.get("parent")
+
+    messages = []
+    for message in reversed(chain):
+        if not message:
+            continue
+        role = (message.get("author") or {}).get("role")
+        metadata = message.get("metadata") or {}
+        if role not in ROLES or metadata.get("is_visually_hidden_from_conversation"):
+            continue
+        text = _chatgpt_text(message)
+        if text.strip():
+            messages.append({"role": role, "content": text})
+    return messages
+
+
+def _claude_messages(conversation: Dict[str, Any]) -> List[Dict[str, str]]:
+    messages = []
+    for message in conversation.get("chat_messages") or []:
+        sender = message.get("sender")
+        role = "user" if sender == "human" else sender
+        if role not in ROLES:
+            continue
+        text = message.get("text")
+        if not text:
+            text = "\n".join(
+                block.get("text", "")
+                for block in message.get("content") or []
+                if isinstance(block, dict) and block.get("type") == "text"
+            )
+        if text and text.strip():
+            messages.append({"role": role, "content": text})
+    return messages
+
+
+def map_conversation(conversation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Map one exported conversation to a local session record.
+
+    Returns:
+        Session record (same shape start_session.py saves), or None if the
+        format is not recognised
+    """
+    oracle = detect_oracle(conversation)
+    if oracle == "chatgpt":
+        conv_id = conversation.get("conversation_id") or conversation.get("id")
+        title = conversation.get("title")
+        model = conversation.get("default_model_slug")
+        messages = _chatgpt_messages(conversation)
+    elif oracle == "claude":
+        conv_id = conversation.get("uuid")
+        title = conversation.get("name")
+        model = conversation.get("model")
+        messages = _claude_messages(conversation)
+    else:
+        return None
+    if not conv_id:
+        return None
+
+    created = _to_datetime(conversation.get("create_time") or conversation.get("created_at"))
+    # Conversation ids become file names; keep them path-safe
+    session_id = f"{oracle}-" + re.sub(r"[^A-Za-z0-9._-]", "_", str(conv_id))
+    return {
+        "session_id": session_id,
+        "persona": None,
+        "model": model,
+        "timestamp": created.isoformat().replace("+00:00", "Z") if created else None,
+        "title": title,
+        "source": {"oracle": oracle, "conversation_id": conv_id},
+        "messages": messages,
+    }
+
+
+# --- Import driver ---
+
+class ImportStats:
+    """Counters updated from worker threads."""
+
+    def __init__(self, total_bytes: int = 0):
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.seen = 0
+        self.written = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def add(self, field: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+
+class _CountingReader:
+    """Text file wrapper that records how many bytes have been consumed."""
+
+    def __init__(self, fp: IO[str], stats: ImportStats):
+        self._fp = fp
+        self._stats = stats
+
+    def read(self, size: int = -1) -> str:
+        data = self._fp.read(size)
+        self._stats.bytes_read = self._fp.buffer.tell()
+        return data
+
+
+def import_export(
+    path: Path,
+    sessions_dir: Path = SESSIONS_DIR,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    oracle: Optional[str] = None,
+    workers: int = 4,
+    overwrite: bool = False,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+) -> ImportStats:
+    """
+    Stream an export file into local sessions.
+
+    Args:
+        path: Export file (a JSON array of conversations)
+        sessions_dir: Where sessions are written
+        since/until: Only import conversations created in [since, until)
+        oracle: Only import conversations from this source ("chatgpt", "claude")
+        workers: Parallel session writers
+        overwrite: Replace sessions that already exist (default: skip them,
+            which makes re-running an interrupted import cheap)
+        progress: Called with the running ImportStats after each conversation
+
+    Returns:
+        Final ImportStats
+    """
+    path = Path(path)
+    store = SessionStore(sessions_dir)
+    stats = ImportStats(path.stat().st_size)
+    # Bound in-flight work so a fast reader can't queue the whole file
+    slots = threading.BoundedSemaphore(max(1, workers) * 4)
+
+    def write(record: Dict[str, Any]) -> None:
+        try:
+            session_id = record["session_id"]
+            if not overwrite and store.exists(session_id):
+                stats.add("skipped")
+                return
+            store.write_record(session_id, record)
+            stats.add("written")
+        finally:
+            slots.release()
+
+    with open(path, "r", encoding="utf-8") as fp, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = []
+        for conversation in iter_json_array(_CountingReader(fp, stats)):
+            stats.add("seen")
+            record = map_conversation(conversation) if isinstance(conversation, dict) else None
+            if record is None or not _wanted(record, conversation, since, until, oracle):
+                stats.add("skipped")
+            else:
+                slots.acquire()
+                futures.append(pool.submit(write, record))
+            if progress:
+                progress(stats)
+            # Surface write errors early and keep the futures list short
+            if len(futures) >= 256:
+                for future in futures:
+                    future.result()
+                futures = []
+        for future in futures:
+            future.result()
+    if progress:
+        progress(stats)
+    return stats
+
+
+def _wanted(record: Dict[str, Any], conversation: Dict[str, Any],
+            since: Optional[datetime], until: Optional[datetime], oracle: Optional[str]) -> bool:
+    if oracle and record["source"]["oracle"] != oracle:
+        return False
+    if since or until:
+        created = _to_datetime(conversation.get("create_time") or conversation.get("created_at"))
+        if created is None:
+            return False
+        if since and created < since:
+            return False
+        if until and created >= until:
+            return False
+    return True
+
+
+def progress_printer(interval: float = 0.25) -> Callable[[ImportStats], None]:
+    """Progress callback printing one line on stderr, at most every `interval` seconds."""
+    last = [0.0]
+
+    def report(stats: ImportStats) -> None:
+        now = time.monotonic()
+        if now - last[0] < interval and stats.bytes_read < stats.total_bytes:
+            return
+        last[0] = now
+        pct = 100.0 * stats.bytes_read / stats.total_bytes if stats.total_bytes else 100.0
+        sys.stderr.write(
+            f"\r   {pct:5.1f}%  {stats.seen} conversations, {stats.written} written, {stats.skipped} skipped"
+        )
+        sys.stderr.flush()
+
+    return report
+
+
+def run(args: argparse.Namespace, sessions_dir: Path = SESSIONS_DIR) -> int:
+    print(f"†⟡ Importing {args.path}...")
+    try:
+        stats = import_export(
+            args.path,
+            sessions_dir=sessions_dir,
+            since=args.since,
+            until=args.until,
+            oracle=args.oracle,
+            workers=args.workers,
+            overwrite=args.overwrite,
+            progress=progress_printer(),
+        )
+    except (OSError, ExportFormatError) as e:
+        print(f"\n   ✗ Error: {e}")
+        return 1
+    sys.stderr.write("\n")
+    print(f"   ✓ {stats.written} session(s) written, {stats.skipped} skipped of {stats.seen}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import an exported conversation archive into local sessions")
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
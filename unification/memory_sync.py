@@ -0,0 +1,374 @@
+"""
+Delta sync of local sessions to the MCP memory store.
+
+Each session keeps a high-water mark (number of messages the server has
+acknowledged) in `.sessions/.sync_state.json`, keyed by server URL so
+syncing to another server starts from scratch. A sync run only ships the
+messages past that mark, in batches posted to `/memory/store/bulk` over
+keep-alive connections. Sessions are synced concurrently, one persistent
+connection per worker; batches within a session stay ordered.
+
+Bulk-store contract:
+
+    POST /memory/store/bulk
+    {"sessionId": "...", "baseSeq": 12, "messages": [{"role": ..., "content": ...}]}
+
+    200 {"ok": true, "highWater": 20, "inserted": 8}
+    409 {"ok": false, "highWater": 7}   # server is behind; client rewinds
+
+Because the server skips messages it already holds, re-sending a batch after
+a crash or timeout is harmless and the sync is restartable.
+"""
+
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .sessions import SessionStore
+
+SESSIONS_DIR = Path(__file__).resolve().parents[1] / ".sessions"
+STATE_FILE = ".sync_state.json"
+BULK_PATH = "/memory/store/bulk"
+
+DEFAULT_BATCH_SIZE = 200
+# Stay well under the MCP server's 1mb JSON body limit
+DEFAULT_BATCH_BYTES = 512 * 1024
+
+
+class SyncError(Exception):
+    """Raised when the MCP server rejects a batch."""
+
+
+class SyncState:
+    """
+    Persistent per-session high-water marks for one server.
+
+    The file maps server URL -> {session id: mark}. Marks are written at
+    most every `flush_interval` seconds plus on flush(); a mark that was not
+    written yet only means re-sending a batch the server will skip. Writes
+    go to a temp file and are renamed into place so an interrupted sync
+    never leaves a truncated state file behind.
+
+    Args:
+        path: State file
+        scope: Server the marks belong to (normally its base URL)
+        flush_interval: Minimum seconds between automatic writes
+    """
+
+    def __init__(self, path: Path, scope: str = "", flush_interval: float = 1.0):
+        self.path = Path(path)
+        self.scope = scope
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, int]] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (ValueError, OSError):
+                data = {}
+            # Older files held one flat mapping for an unknown server: drop it
+            if isinstance(data, dict):
+                self._data = {k: v for k, v in data.items() if isinstance(v, dict)}
+        self._marks = self._data.setdefault(scope, {})
+        self._dirty = False
+        self._flushed = time.monotonic()
+
+    def get(self, session_id: str) -> int:
+        with self._lock:
+            return int(self._marks.get(session_id, 0))
+
+    def set(self, session_id: str, mark: int) -> None:
+        with self._lock:
+            self._marks[session_id] = int(mark)
+            self._dirty = True
+            if time.monotonic() - self._flushed >= self.flush_interval:
+                self._write()
+
+    def flush(self) -> None:
+        """Write pending marks now."""
+        with self._lock:
+            if self._dirty:
+                self._write()
+
+    def _write(self) -> None:
+        # Caller holds self._lock
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._data), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._dirty = False
+        self._flushed = time.monotonic()
+
+
+class MemoryClient:
+    """
+    Minimal keep-alive client for the MCP memory endpoints.
+
+    One HTTPConnection is kept per thread and reused for every batch; it is
+    reopened transparently if the server closes it.
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def post_json(self, path: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        if self.api_key:
+            headers["X-API-Key"] = self.api_key
+        # One retry covers a keep-alive connection the server already dropped
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("POST", self.prefix + path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                if resp.getheader("Connection", "").lower() == "close":
+                    self._reset()
+            except (http.client.HTTPException, ConnectionError, OSError) as e:
+                self._reset()
+                if not attempt:
+                    continue
+                if isinstance(e, http.client.HTTPException):
+                    raise SyncError(f"{path}: bad HTTP response: {e!r}") from e
+                raise
+            try:
+                return resp.status, json.loads(data or b"{}")
+            except ValueError:
+                # e.g. Express' HTML 404 (no bulk route) or 413 (body too large)
+                raise SyncError(f"{path}: HTTP {resp.status} with non-JSON body") from None
+
+    def store_bulk(self, session_id: str, base_seq: int, messages: List[Dict[str, str]]) -> Tuple[int, Dict[str, Any]]:
+        return self.post_json(BULK_PATH, {
+            "sessionId": session_id,
+            "baseSeq": base_seq,
+            "messages": messages,
+        })
+
+    def close(self) -> None:
+        self._reset()
+
+
+def _batches(messages: List[Dict[str, str]], batch_size: int, batch_bytes: int):
+    """Yield (offset, batch) chunks bounded by count and approximate size."""
+    start, size, batch = 0, 0, []
+    for index, message in enumerate(messages):
+        item = {"role": message.get("role", "user"), "content": message.get("content") or ""}
+        item_size = len(item["content"].encode("utf-8")) + 32
+        if batch and (len(batch) >= batch_size or size + item_size > batch_bytes):
+            yield start, batch
+            start, size, batch = index, 0, []
+        batch.append(item)
+        size += item_size
+    if batch:
+        yield start, batch
+
+
+class MemorySync:
+    """
+    Ship unsent local session messages to the MCP memory store.
+
+    Args:
+        client: MemoryClient (or anything with a compatible store_bulk)
+        sessions_dir: Directory containing `<session_id>.json` files
+        batch_size: Maximum messages per bulk request
+        batch_bytes: Approximate maximum body size per bulk request
+        workers: Sessions synced concurrently
+        store: SessionStore to read from (one for `sessions_dir` by default).
+            It is shared by the whole run so the archive index is parsed once.
+    """
+
+    def __init__(
+        self,
+        client: MemoryClient,
+        sessions_dir: Path = SESSIONS_DIR,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_bytes: int = DEFAULT_BATCH_BYTES,
+        workers: int = 4,
+        store: Optional[SessionStore] = None,
+    ):
+        self.client = client
+        self.sessions_dir = Path(sessions_dir)
+        self.batch_size = max(1, batch_size)
+        self.batch_bytes = batch_bytes
+        self.workers = max(1, workers)
+        self.store = store if store is not None else SessionStore(self.sessions_dir)
+        self.state = SyncState(self.sessions_dir / STATE_FILE, scope=getattr(client, "base_url", ""))
+
+    def sync_session(self, session_id: str) -> int:
+        """
+        Sync one session.
+
+        Returns:
+            Number of messages newly acknowledged by the server
+        """
+        messages = self.store.history(session_id)
+        start_mark = mark = min(self.state.get(session_id), len(messages))
+        rewinds = 0
+        while mark < len(messages):
+            base = mark
+            for offset, batch in _batches(messages[base:], self.batch_size, self.batch_bytes):
+                status, body = self.client.store_bulk(session_id, base + offset, batch)
+                if status == 409:
+                    # Server lost data or never saw earlier batches: rewind once
+                    rewinds += 1
+                    if rewinds > 1:
+                        raise SyncError(f"{session_id}: server high-water keeps moving back")
+                    mark = int(body.get("highWater", 0))
+                    start_mark = min(start_mark, mark)
+                    self.state.set(session_id, mark)
+                    break
+                if status >= 400 or not body.get("ok", False):
+                    raise SyncError(f"{session_id}: bulk store failed ({status}): {body}")
+                end = base + offset + len(batch)
+                mark = min(len(messages), max(end, int(body.get("highWater", end))))
+                self.state.set(session_id, mark)
+        return mark - start_mark
+
+    def run(
+        self,
+        session_ids: Optional[List[str]] = None,
+        progress: Optional[Callable[[str, int], None]] = None,
+    ) -> Dict[str, int]:
+        """
+        Sync the given sessions (all local sessions by default).
+
+        Returns:
+            Mapping of session id to messages sent in this run
+        """
+        ids = session_ids if session_ids is not None else self.store.list_ids()
+        results: Dict[str, int] = {}
+
+        def work(session_id: str) -> None:
+            sent = self.sync_session(session_id)
+            results[session_id] = sent
+            if progress:
+                progress(session_id, sent)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for future in [pool.submit(work, sid) for sid in ids]:
+                    future.result()
+        finally:
+            self.state.flush()
+        return results
+
+
+# --- Local stand-in for the MCP memory endpoints ---
+
+class LocalMemoryServer:
+    """
+    In-process stand-in for the MCP server's memory endpoints.
+
+    Implements `/memory/store/bulk` with the same idempotency rules as the
+    real server plus `/memory/retrieve`, keeping everything in a dict. Useful
+    for tests and for dry runs without the Node server.
+
+        with LocalMemoryServer() as server:
+            MemorySync(MemoryClient(server.url)).run()
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.memories: Dict[str, List[Dict[str, str]]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        store = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != BULK_PATH:
+                    return self._send(404, {"error": "not found"})
+                status, payload = store.store_bulk(body)
+                self._send(status, payload)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path != "/memory/retrieve":
+                    return self._send(404, {"error": "not found"})
+                session_id = parse_qs(parts.query).get("sessionId", [""])[0]
+                with store._lock:
+                    memories = list(store.memories.get(session_id, []))
+                self._send(200, {"sessionId": session_id, "memories": memories})
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def store_bulk(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        session_id = body.get("sessionId")
+        base_seq = body.get("baseSeq")
+        messages = body.get("messages")
+        if not session_id or not isinstance(base_seq, int) or not isinstance(messages, list):
+            return 400, {"error": "sessionId, baseSeq and messages required"}
+        with self._lock:
+            self.requests += 1
+            stored = self.memories.setdefault(session_id, [])
+            if len(stored) < base_seq:
+                return 409, {"ok": False, "sessionId": session_id, "highWater": len(stored)}
+            fresh = messages[len(stored) - base_seq:]
+            stored.extend(fresh)
+            high_water = max(len(stored), base_seq + len(messages))
+        return 200, {"ok": True, "sessionId": session_id, "highWater": high_water, "inserted": len(fresh)}
+
+    def start(self) -> "LocalMemoryServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "LocalMemoryServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
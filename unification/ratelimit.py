@@ -0,0 +1,865 @@
+"""
+Client-side rate limiting for provider calls.
+
+Each (provider, model) pair gets a ProviderLimiter that combines two token
+buckets (requests per minute and tokens per minute) with an AIMD concurrency
+window. The window grows by one slot per full window of successful calls and
+shrinks multiplicatively on 429s or when latency climbs well above the
+observed baseline. Latency here means time to first chunk for streams and
+time per output token otherwise, so long completions are not mistaken for
+queueing at the provider. Retry-After is honoured by pausing the whole
+limiter.
+
+Limiters handed out by get_limiter() keep their budgets (both buckets and
+the Retry-After pause) in a small flock-guarded file per provider/model, so
+separate processes on one host, e.g. a batch job launching many
+start_session.py runs, draw from the same budget. The concurrency window
+itself is per process.
+
+Streaming calls (stream=True) hold their slot until the returned stream is
+exhausted or closed, so the window covers the whole body download. Disable
+the provider SDK's own retries (e.g. OpenAI(max_retries=0)) so 429s reach
+the limiter instead of being retried underneath it.
+
+Both blocking and asyncio callers are supported:
+
+    limiter = get_limiter("openai", "gpt-4")
+    response = limiter.call(client.chat.completions.create, model=..., messages=...)
+    response = await limiter.acall(aclient.chat.completions.create, model=..., messages=...)
+"""
+
+import asyncio
+import email.utils
+import fcntl
+import json
+import logging
+import os
+import re
+import stat
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS_CONFIG = Path(__file__).resolve().parents[1] / "configs" / "providers.yaml"
+
+# Conservative defaults used when a provider has no rate_limits block
+DEFAULT_LIMITS = {
+    "requests_per_minute": 60,
+    "tokens_per_minute": 90000,
+    "max_concurrency": 8,
+}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call is still throttled after all retries."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations instead of blocking.
+
+    reserve() always succeeds and returns how long the caller must wait
+    before the reserved amount is actually available. The balance is allowed
+    to go negative, which keeps ordering fair without holding a lock while
+    sleeping.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` tokens and return the delay in seconds until they are covered."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            # A single request larger than the bucket would otherwise never fit
+            amount = min(float(amount), self.capacity)
+            self._tokens -= amount
+            if self._tokens >= 0 or self.rate <= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def adjust(self, delta: float) -> None:
+        """Credit (positive) or charge (negative) tokens after the fact."""
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens = min(self.capacity, self._tokens + delta)
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency window shared by threads and event loops.
+
+    Waiters from either world are woken on release: threads through a
+    Condition, coroutines through futures resolved on their own loop.
+    """
+
+    def __init__(
+        self,
+        initial: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        latency_backoff: float = 0.9,
+    ):
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.latency_backoff = latency_backoff
+        self.in_flight = 0
+        # Baseline per signal kind ("ttfb", "per_token", ...): they are not comparable
+        self.min_latency: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _has_room(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self._has_room():
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while not self._has_room():
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._has_room():
+                    self.in_flight += 1
+                    return
+                fut = loop.create_future()
+                self._async_waiters.append((loop, fut))
+            try:
+                await fut
+            except asyncio.CancelledError:
+                with self._cond:
+                    if (loop, fut) in self._async_waiters:
+                        self._async_waiters.remove((loop, fut))
+                raise
+
+    def _wake(self) -> None:
+        # Caller holds self._cond
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(_resolve, fut)
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._wake()
+
+    def on_success(self, latency: Optional[float] = None, kind: str = "latency") -> None:
+        """
+        Additive increase, unless latency signals queueing at the provider.
+
+        Each `kind` of latency is compared against its own observed minimum.
+        """
+        with self._cond:
+            if latency is not None and latency > 0:
+                baseline = self.min_latency.get(kind)
+                if baseline is None or latency < baseline:
+                    baseline = self.min_latency[kind] = latency
+                if latency > baseline * self.latency_tolerance:
+                    self.limit = max(self.min_limit, self.limit * self.latency_backoff)
+                    # Let the baseline drift so one slow period doesn't pin the window
+                    self.min_latency[kind] = baseline * 1.05
+                    return
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def on_throttle(self) -> None:
+        """Multiplicative decrease after a 429."""
+        with self._cond:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+def estimate_tokens(messages: Optional[List[Dict[str, Any]]] = None, max_tokens: int = 0) -> int:
+    """
+    Rough token estimate for a chat request (~4 characters per token).
+
+    Args:
+        messages: Chat messages with 'role' and 'content'
+        max_tokens: Completion budget requested from the provider
+
+    Returns:
+        Estimated prompt plus completion tokens
+    """
+    total = 0
+    for message in messages or []:
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = str(content)
+        total += 4 + len(content) // 4
+    return total + int(max_tokens or 0)
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta seconds or HTTP date) into seconds.
+
+    Returns:
+        Seconds to wait, or None if the value is missing or unparseable
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+def throttle_info(exc: BaseException) -> Tuple[bool, Optional[float]]:
+    """
+    Classify an exception raised by a provider client.
+
+    Works with openai/anthropic SDK errors and requests' HTTPError, all of
+    which expose a status code and the HTTP response headers.
+
+    Returns:
+        (is_throttled, retry_after_seconds)
+    """
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429 and type(exc).__name__ != "RateLimitError":
+        return False, None
+
+    headers = getattr(response, "headers", None) or {}
+    retry_after = None
+    ms = headers.get("retry-after-ms") if hasattr(headers, "get") else None
+    if ms is not None:
+        try:
+            retry_after = max(0.0, float(ms) / 1000.0)
+        except ValueError:
+            retry_after = None
+    if retry_after is None and hasattr(headers, "get"):
+        retry_after = parse_retry_after(headers.get("retry-after"))
+    return True, retry_after
+
+
+class SharedBudget:
+    """
+    Request/token buckets and the Retry-After pause shared across processes.
+
+    State lives in a small JSON file that is read, refilled and rewritten
+    under an exclusive flock on every admission. Wall-clock time is used so
+    all processes agree on refill.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.request_rate = requests_per_minute / 60.0
+        self.request_capacity = max(1.0, float(requests_per_minute))
+        self.token_rate = tokens_per_minute / 60.0
+        self.token_capacity = float(tokens_per_minute)
+        self._clock = clock
+        _private_dir(self.path.parent)
+
+    @contextmanager
+    def _state(self):
+        # O_NOFOLLOW: never truncate whatever a planted symlink points at
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        with os.fdopen(fd, "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    state = {}
+                now = self._clock()
+                if not state:
+                    state = {
+                        "requests": self.request_capacity,
+                        "tokens": self.token_capacity,
+                        "updated": now,
+                        "blocked_until": 0.0,
+                    }
+                elapsed = max(0.0, now - state["updated"])
+                state["requests"] = min(self.request_capacity, state["requests"] + elapsed * self.request_rate)
+                state["tokens"] = min(self.token_capacity, state["tokens"] + elapsed * self.token_rate)
+                state["updated"] = now
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def admit(self, est_tokens: int) -> float:
+        """Reserve one request and `est_tokens`; return the delay until both are covered."""
+        with self._state() as state:
+            state["requests"] -= 1
+            delay = -state["requests"] / self.request_rate if state["requests"] < 0 and self.request_rate > 0 else 0.0
+            if self.token_capacity and est_tokens:
+                state["tokens"] -= min(float(est_tokens), self.token_capacity)
+                if state["tokens"] < 0 and self.token_rate > 0:
+                    delay = max(delay, -state["tokens"] / self.token_rate)
+            return max(delay, state["blocked_until"] - state["updated"])
+
+    def adjust_tokens(self, delta: float) -> None:
+        if not self.token_capacity:
+            return
+        with self._state() as state:
+            state["tokens"] = min(self.token_capacity, state["tokens"] + delta)
+
+    def pause(self, seconds: float) -> None:
+        with self._state() as state:
+            state["blocked_until"] = max(state["blocked_until"], state["updated"] + seconds)
+
+
+class _HeldBase:
+    """
+    Bookkeeping shared by the stream proxies: keeps the limiter slot until
+    the stream is exhausted, fails or is closed, and records when the first
+    chunk arrived and any usage the provider reported along the way.
+    """
+
+    def __init__(self, stream: Any, clock: Callable[[], float], done: Callable[["_HeldBase", bool], None]):
+        # Set before anything can raise: __getattr__ forwards to the stream
+        self._finished = False
+        self._done = done
+        self._clock = clock
+        self._stream = stream
+        self.first_chunk_at: Optional[float] = None
+        self.chunks = 0
+        self.usage_tokens: Optional[int] = None
+
+    def _seen(self, chunk: Any) -> Any:
+        if self.first_chunk_at is None:
+            self.first_chunk_at = self._clock()
+        self.chunks += 1
+        tokens = _usage_tokens(chunk)
+        if tokens is not None:
+            self.usage_tokens = tokens
+        return chunk
+
+    def _finish(self, ok: bool) -> None:
+        if not self._finished:
+            self._finished = True
+            self._done(self, ok)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def __del__(self):
+        self._finish(False)
+
+
+class _HeldStream(_HeldBase):
+    """Proxy for a blocking streaming response."""
+
+    def __init__(self, stream: Any, clock: Callable[[], float], done: Callable[[_HeldBase, bool], None]):
+        super().__init__(stream, clock, done)
+        try:
+            self._iter = iter(stream)
+        except BaseException:
+            self._finish(False)
+            raise
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return self._seen(next(self._iter))
+        except StopIteration:
+            self._finish(True)
+            raise
+        except BaseException:
+            self._finish(False)
+            raise
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._stream, "close", None)
+            if close:
+                close()
+        finally:
+            self._finish(False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _HeldAsyncStream(_HeldBase):
+    """Asyncio counterpart of _HeldStream."""
+
+    def __init__(self, stream: Any, clock: Callable[[], float], done: Callable[[_HeldBase, bool], None]):
+        super().__init__(stream, clock, done)
+        try:
+            self._iter = stream.__aiter__()
+        except BaseException:
+            self._finish(False)
+            raise
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return self._seen(await self._iter.__anext__())
+        except StopAsyncIteration:
+            self._finish(True)
+            raise
+        except BaseException:
+            self._finish(False)
+            raise
+
+    async def close(self) -> None:
+        try:
+            close = getattr(self._stream, "close", None)
+            if close:
+                await close()
+        finally:
+            self._finish(False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+class ProviderLimiter:
+    """
+    Rate limiter for a single provider/model pair.
+
+    Args:
+        requests_per_minute: Request budget
+        tokens_per_minute: Token budget (0 disables token limiting)
+        max_concurrency: Upper bound for the adaptive concurrency window
+        initial_concurrency: Starting concurrency window
+        max_retries: Retries on 429 before raising RateLimitExceeded
+        shared_path: State file for budgets shared across processes
+            (None keeps them in this process only)
+        clock/sleep: Injectable time sources for tests
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = DEFAULT_LIMITS["requests_per_minute"],
+        tokens_per_minute: float = DEFAULT_LIMITS["tokens_per_minute"],
+        max_concurrency: int = DEFAULT_LIMITS["max_concurrency"],
+        initial_concurrency: Optional[int] = None,
+        max_retries: int = 5,
+        shared_path: Optional[Path] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._clock = clock
+        self._sleep = sleep
+        self.requests = TokenBucket(requests_per_minute / 60.0, max(1.0, requests_per_minute), clock)
+        self.tokens = (
+            TokenBucket(tokens_per_minute / 60.0, tokens_per_minute, clock)
+            if tokens_per_minute
+            else None
+        )
+        if initial_concurrency is None:
+            initial_concurrency = max(1, max_concurrency // 4)
+        self.concurrency = AdaptiveConcurrency(initial=initial_concurrency, max_limit=max_concurrency)
+        self.max_retries = max_retries
+        self.shared = (
+            SharedBudget(shared_path, requests_per_minute, tokens_per_minute)
+            if shared_path
+            else None
+        )
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    # --- admission ---
+
+    def _admission_delay(self, est_tokens: int) -> float:
+        if self.shared is not None:
+            return self.shared.admit(est_tokens)
+        delay = self.requests.reserve(1)
+        if self.tokens is not None and est_tokens:
+            delay = max(delay, self.tokens.reserve(est_tokens))
+        with self._lock:
+            delay = max(delay, self._blocked_until - self._clock())
+        return delay
+
+    def pause(self, seconds: float) -> None:
+        """Block all new calls for `seconds` (used for Retry-After)."""
+        if self.shared is not None:
+            self.shared.pause(seconds)
+            return
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    def record_usage(self, est_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Reconcile the token bucket once the provider reports real usage."""
+        if self.tokens is None or actual_tokens is None:
+            return
+        if self.shared is not None:
+            self.shared.adjust_tokens(est_tokens - actual_tokens)
+            return
+        self.tokens.adjust(est_tokens - actual_tokens)
+
+    def _throttled(self, retry_after: Optional[float]) -> None:
+        self.concurrency.on_throttle()
+        if retry_after is not None:
+            self.pause(retry_after)
+
+    def _begin(self, est_tokens: int) -> float:
+        """Take a concurrency slot and wait for admission; returns the start time."""
+        self.concurrency.acquire()
+        try:
+            delay = self._admission_delay(est_tokens)
+            if delay > 0:
+                self._sleep(delay)
+        except BaseException:
+            self.concurrency.release()
+            raise
+        return self._clock()
+
+    async def _abegin(self, est_tokens: int) -> float:
+        await self.concurrency.acquire_async()
+        try:
+            delay = self._admission_delay(est_tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            self.concurrency.release()
+            raise
+        return self._clock()
+
+    def _finish(self, started: float, ok: bool, latency: Optional[float] = None, kind: str = "latency") -> None:
+        """Release a slot, feeding the congestion signal of successful calls to AIMD."""
+        try:
+            if ok:
+                self.concurrency.on_success(latency, kind)
+        finally:
+            self.concurrency.release()
+
+    def _complete(self, started: float, est: int, result: Any) -> None:
+        """
+        Finish a non-streaming call.
+
+        The full response time mostly reflects completion length, so AIMD
+        sees latency per output token instead (nothing when usage is missing).
+        """
+        latency = None
+        completion = _usage_tokens(result, "completion_tokens")
+        if completion:
+            latency = (self._clock() - started) / completion
+        self._finish(started, True, latency, "per_token")
+        self.record_usage(est, _usage_tokens(result))
+
+    def _stream_done(self, started: float, est: int, prompt_est: int) -> Callable[[_HeldBase, bool], None]:
+        """
+        Completion callback for a held stream: time to first chunk feeds
+        AIMD, and the token bucket is reconciled from the usage chunk
+        (stream_options={"include_usage": True}) or, failing that, charged
+        about one token per streamed chunk.
+        """
+
+        def done(stream: _HeldBase, ok: bool) -> None:
+            ttfb = None if stream.first_chunk_at is None else stream.first_chunk_at - started
+            self._finish(started, ok, ttfb, "ttfb")
+            actual = stream.usage_tokens
+            if actual is None:
+                actual = max(est, prompt_est + stream.chunks)
+            self.record_usage(est, actual)
+
+        return done
+
+    @contextmanager
+    def slot(self, est_tokens: int = 0):
+        """Blocking context manager holding one admission for a call."""
+        started = self._begin(est_tokens)
+        ok = False
+        try:
+            yield self
+            ok = True
+        finally:
+            self._finish(started, ok)
+
+    @asynccontextmanager
+    async def aslot(self, est_tokens: int = 0):
+        """Asyncio counterpart of slot()."""
+        started = await self._abegin(est_tokens)
+        ok = False
+        try:
+            yield self
+            ok = True
+        finally:
+            self._finish(started, ok)
+
+    # --- call wrappers ---
+
+    def _estimate(self, kwargs: Dict[str, Any], est_tokens: Optional[int]) -> Tuple[int, int]:
+        """Return (admission estimate, prompt-only estimate) for a call."""
+        if est_tokens is not None:
+            return est_tokens, est_tokens
+        prompt = estimate_tokens(kwargs.get("messages"))
+        return prompt + int(kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0), prompt
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return 0.0  # the pause already covers it
+        return min(30.0, 0.5 * (2 ** attempt))
+
+    def call(self, fn: Callable[..., Any], *args, est_tokens: Optional[int] = None, **kwargs) -> Any:
+        """
+        Invoke `fn(*args, **kwargs)` under the limiter, retrying on 429.
+
+        With stream=True the slot is held until the returned stream is
+        exhausted or closed; pass stream_options={"include_usage": True}
+        (OpenAI) so the token budget is reconciled from real usage.
+
+        Returns:
+            Whatever `fn` returns (wrapped when streaming)
+        """
+        est, prompt_est = self._estimate(kwargs, est_tokens)
+        retry_after = None
+        for attempt in range(self.max_retries + 1):
+            started = self._begin(est)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                self._finish(started, ok=False)
+                throttled, retry_after = throttle_info(exc)
+                if not throttled:
+                    raise
+                self._throttled(retry_after)
+                if attempt == self.max_retries:
+                    raise RateLimitExceeded(str(exc), retry_after) from exc
+                wait = self._backoff(attempt, retry_after)
+                if wait:
+                    self._sleep(wait)
+                continue
+            if kwargs.get("stream"):
+                return _HeldStream(result, self._clock, self._stream_done(started, est, prompt_est))
+            self._complete(started, est, result)
+            return result
+        raise RateLimitExceeded("rate limit retries exhausted", retry_after)
+
+    async def acall(self, fn: Callable[..., Any], *args, est_tokens: Optional[int] = None, **kwargs) -> Any:
+        """Asyncio counterpart of call(); `fn` must return an awaitable."""
+        est, prompt_est = self._estimate(kwargs, est_tokens)
+        retry_after = None
+        for attempt in range(self.max_retries + 1):
+            started = await self._abegin(est)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as exc:
+                self._finish(started, ok=False)
+                throttled, retry_after = throttle_info(exc)
+                if not throttled:
+                    raise
+                self._throttled(retry_after)
+                if attempt == self.max_retries:
+                    raise RateLimitExceeded(str(exc), retry_after) from exc
+                wait = self._backoff(attempt, retry_after)
+                if wait:
+                    await asyncio.sleep(wait)
+                continue
+            if kwargs.get("stream"):
+                return _HeldAsyncStream(result, self._clock, self._stream_done(started, est, prompt_est))
+            self._complete(started, est, result)
+            return result
+        raise RateLimitExceeded("rate limit retries exhausted", retry_after)
+
+
+def _usage_tokens(result: Any, field: str = "total_tokens") -> Optional[int]:
+    usage = getattr(result, "usage", None)
+    if usage is None and isinstance(result, dict):
+        usage = result.get("usage")
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get(field)
+    return getattr(usage, field, None)
+
+
+def load_limits(path: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Load per-provider rate_limits from configs/providers.yaml.
+
+    A provider block may carry a `rate_limits` mapping with defaults and an
+    optional `models` mapping of per-model overrides. Returns an empty dict
+    if the file or PyYAML is unavailable.
+    """
+    path = Path(path) if path else PROVIDERS_CONFIG
+    if not path.exists():
+        return {}
+    try:
+        import yaml
+    except ImportError:
+        return {}
+    with open(path, "r") as f:
+        data = yaml.safe_load(f) or {}
+    return {
+        name: block.get("rate_limits") or {}
+        for name, block in data.items()
+        if isinstance(block, dict)
+    }
+
+
+def default_shared_dir() -> Path:
+    """Directory for cross-process budget files ($SPIRAL_RATE_LIMIT_DIR or a per-user runtime dir)."""
+    env = os.environ.get("SPIRAL_RATE_LIMIT_DIR")
+    if env:
+        return Path(env)
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(base) / f"spiral-ratelimit-{os.getuid()}"
+
+
+def _private_dir(path: Path) -> Path:
+    """
+    Create `path` as a 0700 directory, or check that an existing one is
+    owned by the current user and not writable by anyone else.
+
+    Raises:
+        PermissionError: If the directory could be tampered with by other users
+    """
+    path = Path(path)
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise PermissionError(f"{path} is not a private directory owned by this user")
+    return path
+
+
+class RateLimiterRegistry:
+    """
+    Hands out one shared ProviderLimiter per (provider, model).
+
+    With `shared_dir` set, each limiter keeps its budgets in a file under
+    that directory so every process using the same directory shares them.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, Any]]] = None,
+        disabled: bool = False,
+        shared_dir: Optional[Path] = None,
+        **limiter_kwargs,
+    ):
+        self._limits = limits if limits is not None else load_limits()
+        self._disabled = disabled
+        self._shared_dir = Path(shared_dir) if shared_dir and not disabled else None
+        self._limiter_kwargs = limiter_kwargs
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def settings_for(self, provider: str, model: str) -> Dict[str, Any]:
+        block = dict(self._limits.get(provider) or {})
+        overrides = block.pop("models", None) or {}
+        settings = dict(DEFAULT_LIMITS)
+        settings.update(block)
+        settings.update(overrides.get(model) or {})
+        if self._disabled:
+            settings["requests_per_minute"] = 10 ** 9
+            settings["tokens_per_minute"] = 0
+        return settings
+
+    def get(self, provider: str, model: str) -> ProviderLimiter:
+        key = (provider, model)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                settings = self.settings_for(provider, model)
+                shared_path = None
+                if self._shared_dir is not None:
+                    name = re.sub(r"[^A-Za-z0-9._-]", "_", f"{provider}--{model}")
+                    shared_path = self._shared_dir / f"{name}.json"
+                limiter = ProviderLimiter(
+                    requests_per_minute=settings["requests_per_minute"],
+                    tokens_per_minute=settings["tokens_per_minute"],
+                    max_concurrency=settings["max_concurrency"],
+                    shared_path=shared_path,
+                    **self._limiter_kwargs,
+                )
+                self._limiters[key] = limiter
+            return limiter
+
+
+_default_registry: Optional[RateLimiterRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_limiter(provider: str, model: str) -> ProviderLimiter:
+    """
+    Return the process-wide limiter for a provider/model.
+
+    Budgets are shared with other processes through default_shared_dir(),
+    which must be a private directory of the current user; otherwise they
+    stay per-process.
+    Set SPIRAL_RATE_LIMIT=off to get a limiter with effectively no budget
+    constraints (concurrency adaptation still applies).
+    """
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            disabled = os.environ.get("SPIRAL_RATE_LIMIT", "").lower() in ("0", "off", "false")
+            shared_dir = None
+            if not disabled:
+                try:
+                    shared_dir = _private_dir(default_shared_dir())
+                except OSError as e:
+                    logger.warning("Rate limit budgets stay per-process: %s", e)
+            _default_registry = RateLimiterRegistry(disabled=disabled, shared_dir=shared_dir)
+        registry = _default_registry
+    return registry.get(provider, model)
@@ -0,0 +1,247 @@
+"""
+Local session storage with copy-on-write forks.
+
+A session lives in `.sessions/<id>.json`. A forked session stores only a
+pointer to its parent, the fork point (number of parent messages it
+inherits) and its own new messages:
+
+    {"session_id": "child", "parent": "root", "fork_point": 6, "messages": [...own turns...]}
+
+Full history is reconstructed lazily by walking the parent chain. Recently
+materialized histories are kept in a small LRU cache keyed on the
+modification times of every file in the chain, so hot branches are rebuilt
+only when one of their ancestors actually changes.
+
+Sessions rolled into archive packs (see archive.py) are read transparently
+when no loose file exists.
+"""
+
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .archive import ArchiveIndex, is_session_file
+
+SESSIONS_DIR = Path(__file__).resolve().parents[1] / ".sessions"
+
+
+class SessionError(Exception):
+    """Raised for missing sessions, bad fork specs or broken parent chains."""
+
+
+def parse_fork_spec(spec: str) -> Tuple[str, int]:
+    """
+    Parse a `<session>@<turn>` fork spec.
+
+    The turn is the number of parent messages the fork inherits (the system
+    prompt counts as message 0).
+
+    Returns:
+        Tuple of (parent_session_id, fork_point)
+    """
+    parent, sep, turn = spec.rpartition("@")
+    if not sep or not parent:
+        raise SessionError(f"Invalid fork spec '{spec}', expected <session>@<turn>")
+    try:
+        fork_point = int(turn)
+    except ValueError:
+        raise SessionError(f"Invalid fork turn '{turn}' in '{spec}'")
+    if fork_point < 0:
+        raise SessionError(f"Fork turn must be >= 0, got {fork_point}")
+    return parent, fork_point
+
+
+class SessionStore:
+    """
+    Read and write session records, resolving fork chains.
+
+    Args:
+        sessions_dir: Directory containing `<session_id>.json` files
+        cache_size: Number of materialized histories kept in memory
+    """
+
+    def __init__(self, sessions_dir: Path = SESSIONS_DIR, cache_size: int = 32):
+        self.sessions_dir = Path(sessions_dir)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[tuple, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.archive = ArchiveIndex(self.sessions_dir)
+        # Ids last seen as loose files; if one vanishes it was likely just archived
+        self._loose: set = set()
+
+    # --- raw records ---
+
+    def path(self, session_id: str) -> Path:
+        return self.sessions_dir / f"{session_id}.json"
+
+    def exists(self, session_id: str) -> bool:
+        return self.path(session_id).exists() or session_id in self.archive
+
+    def list_ids(self) -> List[str]:
+        """All session ids, loose and archived."""
+        ids = set(self.archive.ids())
+        if self.sessions_dir.exists():
+            loose = {p.stem for p in self.sessions_dir.iterdir() if is_session_file(p)}
+            with self._lock:
+                self._loose.update(loose)
+            ids.update(loose)
+        return sorted(ids)
+
+    def _stamp(self, session_id: str) -> Optional[int]:
+        try:
+            return os.stat(self.path(session_id)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def read_record(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored record for a session, or None if it doesn't exist."""
+        try:
+            record = json.loads(self.path(session_id).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            with self._lock:
+                was_loose = session_id in self._loose
+                self._loose.discard(session_id)
+            return self.archive.load(session_id, refresh_on_miss=was_loose)
+        with self._lock:
+            self._loose.add(session_id)
+        return record
+
+    def write_record(self, session_id: str, record: Dict[str, Any]) -> None:
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(session_id)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+        with self._lock:
+            self._cache.pop(session_id, None)
+
+    # --- history ---
+
+    def _chain(self, session_id: str) -> List[Tuple[str, Optional[int], Dict[str, Any]]]:
+        """(id, mtime, record) from the session up to its root, child first."""
+        chain = []
+        seen = set()
+        current = session_id
+        while current is not None:
+            if current in seen:
+                raise SessionError(f"Fork cycle detected at session {current}")
+            seen.add(current)
+            # Stamp before reading so a concurrent write invalidates the cache entry
+            stamp = self._stamp(current)
+            record = self.read_record(current)
+            if record is None:
+                if current == session_id:
+                    return []
+                raise SessionError(f"Missing parent session {current} (needed by {session_id})")
+            chain.append((current, stamp, record))
+            current = record.get("parent")
+        return chain
+
+    def history(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Full message history of a session, following fork parents.
+
+        Returns:
+            List of messages (empty if the session doesn't exist). The list
+            is a fresh copy the caller may mutate.
+        """
+        with self._lock:
+            cached = self._cache.get(session_id)
+        if cached:
+            # A parent pointer only changes with its file, so stat-ing the
+            # cached chain is enough to validate the entry
+            stamp = tuple((sid, self._stamp(sid)) for sid, _ in cached[0])
+            if stamp == cached[0]:
+                with self._lock:
+                    if session_id in self._cache:
+                        self._cache.move_to_end(session_id)
+                return list(cached[1])
+
+        chain = self._chain(session_id)
+        if not chain:
+            return []
+
+        messages: List[Dict[str, Any]] = []
+        # Walk root first; each fork truncates what it inherits
+        for _, _, record in reversed(chain):
+            if record.get("parent") is not None:
+                del messages[int(record.get("fork_point", 0)):]
+            messages.extend(record.get("messages", []))
+
+        stamp = tuple((sid, mtime) for sid, mtime, _ in chain)
+        with self._lock:
+            self._cache[session_id] = (stamp, messages)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(messages)
+
+    # --- writes ---
+
+    def check_fork(self, parent_id: str, fork_point: int) -> None:
+        """
+        Validate that `parent_id` exists and has at least `fork_point` messages.
+
+        Only the parent's own record is read: its length is its fork point
+        plus its own messages, so the check is O(1) in history length.
+        """
+        record = self.read_record(parent_id)
+        if record is None:
+            raise SessionError(f"Cannot fork unknown session: {parent_id}")
+        available = len(record.get("messages", []))
+        if record.get("parent") is not None:
+            available += int(record.get("fork_point", 0))
+        if fork_point > available:
+            raise SessionError(
+                f"Fork point {fork_point} is past the end of {parent_id} ({available} messages)"
+            )
+
+    def fork(self, parent_id: str, fork_point: int, session_id: Optional[str] = None) -> str:
+        """
+        Create a fork of `parent_id` inheriting its first `fork_point` messages.
+
+        Only the pointer is written; no history is copied.
+
+        Returns:
+            The new session id
+        """
+        self.check_fork(parent_id, fork_point)
+        session_id = session_id or str(uuid.uuid4())
+        if self.exists(session_id):
+            raise SessionError(f"Session already exists: {session_id}")
+        self.write_record(session_id, {
+            "session_id": session_id,
+            "parent": parent_id,
+            "fork_point": int(fork_point),
+            "messages": [],
+        })
+        return session_id
+
+    def save(self, session_id: str, payload: Dict[str, Any]) -> None:
+        """
+        Save a session payload carrying the full message history.
+
+        Forked sessions keep their parent pointer and only persist the
+        messages past their fork point. The payload must start with exactly
+        the inherited history, otherwise SessionError is raised rather than
+        silently storing the wrong turns.
+        """
+        record = dict(payload)
+        existing = self.read_record(session_id)
+        if existing and existing.get("parent") is not None:
+            fork_point = int(existing.get("fork_point", 0))
+            messages = list(payload.get("messages", []))
+            inherited = self.history(existing["parent"])[:fork_point]
+            if messages[:fork_point] != inherited:
+                raise SessionError(
+                    f"History of fork {session_id} no longer starts with the "
+                    f"{fork_point} messages inherited from {existing['parent']}"
+                )
+            record["parent"] = existing["parent"]
+            record["fork_point"] = fork_point
+            record["messages"] = messages[fork_point:]
+        self.write_record(session_id, record)